@@ -0,0 +1,272 @@
+import argparse
+import glob
+import json
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from src.instance import read_input_file
+from src.model.algorithm import TabuSearchAlgorithm
+from src.model.callbacks import SearchCallback
+from src.model.modeling import ClassCourseTeacherAssignmentProblem
+from src.utils import format_table
+from tabusearch import initial_state
+
+# Metrics compared against a baseline: name -> True if higher is better
+METRICS = {
+    "steps_per_second": True,
+    "evaluations_per_second": True,
+    "time_to_feasible": False,
+    "time_to_max_score": False,
+    "score": True,
+}
+
+
+class BenchmarkRecorder(SearchCallback):
+    """
+    Records throughput and time-to-target milestones of a TabuSearchAlgorithm run
+    """
+
+    def on_start(self, search):
+        self.search = search
+        self.evaluations = 0
+        self.time_to_feasible = None
+        self.time_to_max_score = None
+        self.start_time = time.perf_counter()
+
+    def on_step(self, step, current_score, best_score):
+        self.evaluations += self.search.neighborhood_size
+        elapsed = time.perf_counter() - self.start_time
+        # No violation when the score only counts assigned class-subjects
+        if self.time_to_feasible is None and current_score == np.count_nonzero(
+            self.search.current.assigned()
+        ):
+            self.time_to_feasible = elapsed
+        if (
+            self.time_to_max_score is None
+            and self.search.max_score is not None
+            and best_score >= self.search.max_score
+        ):
+            self.time_to_max_score = elapsed
+
+    def on_terminate(self, step, best_score, reason):
+        self.run_time = time.perf_counter() - self.start_time
+
+
+def benchmark_instance(opt, file_path, seed):
+    problem = ClassCourseTeacherAssignmentProblem(*read_input_file(file_path))
+    if not opt.no_presolve:
+        presolved = problem.presolve()
+        # A search needs at least one class-subject to move
+        if len(presolved.classes) > 0:
+            problem = presolved
+    max_score = problem.get_maximum_score(opt.constraints, opt.flow_bound)
+
+    random.seed(seed)
+    recorder = BenchmarkRecorder()
+    algorithm = TabuSearchAlgorithm(
+        problem,
+        initial_state(opt, problem),
+        opt.tabu_tenure,
+        opt.max_steps,
+        opt.neighborhood_size,
+        constraints=opt.constraints,
+        max_score=max_score,
+        callbacks=[recorder],
+    )
+    _, score = algorithm.run(verbose=False)
+
+    return {
+        "seed": seed,
+        "steps": algorithm.cur_steps,
+        "time": recorder.run_time,
+        "steps_per_second": algorithm.cur_steps / recorder.run_time,
+        "evaluations_per_second": recorder.evaluations / recorder.run_time,
+        "time_to_feasible": recorder.time_to_feasible,
+        "time_to_max_score": recorder.time_to_max_score,
+        "score": int(score),
+        "max_score": max_score,
+    }
+
+
+def summarize(runs):
+    """Median of each metric over the runs that reached it"""
+    summary = {}
+    for metric in METRICS:
+        values = [run[metric] for run in runs if run[metric] is not None]
+        summary[metric] = statistics.median(values) if values else None
+    summary["reached_max_score"] = sum(
+        run["time_to_max_score"] is not None for run in runs
+    )
+    return summary
+
+
+def compare(results, baseline, tolerance, resolution):
+    """
+    Compares the summaries of two benchmark results
+
+    :param tolerance: relative change allowed on throughput and timing metrics
+    :param resolution: absolute change in seconds below which timings are noise
+    :return: list of (instance, metric, baseline value, current value)
+    """
+    regressions = []
+    for instance, result in results["instances"].items():
+        if instance not in baseline["instances"]:
+            continue
+        current = result["summary"]
+        previous = baseline["instances"][instance]["summary"]
+        for metric, higher_is_better in METRICS.items():
+            old, new = previous[metric], current[metric]
+            if old is None:
+                continue
+            if new is None:
+                regressions.append((instance, metric, old, new))
+            elif metric == "score":
+                if new < old:
+                    regressions.append((instance, metric, old, new))
+            elif higher_is_better and new < old * (1 - tolerance):
+                regressions.append((instance, metric, old, new))
+            elif not higher_is_better and new > max(
+                old * (1 + tolerance), old + resolution
+            ):
+                regressions.append((instance, metric, old, new))
+
+    return regressions
+
+
+def print_results(results):
+    header = (
+        "INSTANCE",
+        "STEPS/S",
+        "EVALS/S",
+        "FEASIBLE (s)",
+        "MAX_SCORE (s)",
+        "SCORE",
+    )
+    rows = []
+    for instance, result in results["instances"].items():
+        summary = result["summary"]
+        rows.append(
+            (
+                instance,
+                f"{summary['steps_per_second']:.1f}",
+                f"{summary['evaluations_per_second']:.0f}",
+                (
+                    "-"
+                    if summary["time_to_feasible"] is None
+                    else f"{summary['time_to_feasible']:.3f}"
+                ),
+                (
+                    "-"
+                    if summary["time_to_max_score"] is None
+                    else f"{summary['time_to_max_score']:.3f}"
+                ),
+                f"{summary['score']:g}",
+            )
+        )
+    print(format_table(header, rows))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--instances",
+        type=str,
+        default="test/test*/input.txt",
+        help="glob of the input files to benchmark",
+    )
+    parser.add_argument(
+        "--seeds", nargs="+", type=int, default=[0, 1, 2], help="seeds of the runs"
+    )
+    parser.add_argument(
+        "--init",
+        type=str,
+        default="random",
+        choices=["random", "greedy"],
+        help="initial state of the runs",
+    )
+    parser.add_argument(
+        "--flow_bound",
+        action="store_true",
+        help="bound the maximum score by the class -> class-subject -> teacher flow",
+    )
+    parser.add_argument(
+        "--no_presolve",
+        action="store_true",
+        help="keep the class-subjects that can never be assigned in the search state",
+    )
+    parser.add_argument("--tabu_tenure", type=int, default=15, help="tabu tenure size")
+    parser.add_argument(
+        "--max_steps", type=int, default=500, help="max number of steps"
+    )
+    parser.add_argument(
+        "--neighborhood_size", type=int, default=70, help="neighborhood size"
+    )
+    parser.add_argument(
+        "--constraints",
+        nargs="+",
+        type=int,
+        default=[1, 2],
+        help="constraints for evaluating score",
+    )
+    parser.add_argument(
+        "--output", type=str, default="benchmark.json", help="JSON file of the results"
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default=None,
+        help="baseline JSON file, exit with an error if a metric regressed",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="relative slowdown allowed before a timing metric is a regression",
+    )
+
+    parser.add_argument(
+        "--resolution",
+        type=float,
+        default=0.05,
+        help="timing changes smaller than this many seconds are not regressions",
+    )
+
+    opt = parser.parse_args()
+
+    results = {
+        "parameters": {
+            "seeds": opt.seeds,
+            "init": opt.init,
+            "presolve": not opt.no_presolve,
+            "flow_bound": opt.flow_bound,
+            "tabu_tenure": opt.tabu_tenure,
+            "max_steps": opt.max_steps,
+            "neighborhood_size": opt.neighborhood_size,
+            "constraints": opt.constraints,
+        },
+        "instances": {},
+    }
+    for file_path in sorted(glob.glob(opt.instances)):
+        runs = [benchmark_instance(opt, file_path, seed) for seed in opt.seeds]
+        results["instances"][file_path] = {"runs": runs, "summary": summarize(runs)}
+
+    print_results(results)
+    with open(opt.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if opt.compare is not None:
+        with open(opt.compare, "r") as f:
+            baseline = json.load(f)
+        if baseline["parameters"] != results["parameters"]:
+            print("WARNING - BASELINE WAS RUN WITH DIFFERENT PARAMETERS")
+
+        regressions = compare(results, baseline, opt.tolerance, opt.resolution)
+        for instance, metric, old, new in regressions:
+            print(f"REGRESSION - {instance} {metric}: {old} -> {new}")
+        if regressions:
+            sys.exit(1)
+        print("NO REGRESSION")
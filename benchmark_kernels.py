@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from copy import deepcopy
+
+from src.instance import read_input_file
+from src.model.evaluator import DeltaEvaluator
+from src.model.modeling import ClassCourseTeacherAssignmentProblem
+from src.utils import format_table
+
+
+def generate_instance(size, subjects_per_class=10, M=60, teachers_per_subject=3):
+    """
+    Generates the text of a random input file with about `size` class-subjects
+
+    :return: content of an input file
+    """
+    N = max(1, size // subjects_per_class)
+    T = max(teachers_per_subject, size // 40)
+
+    lines = [f"{T} {N} {M}"]
+    for _ in range(N):
+        subjects = random.sample(range(1, M + 1), min(subjects_per_class, M))
+        lines.append(" ".join(map(str, subjects + [0])))
+
+    teacher_subjects = [[] for _ in range(T)]
+    for subject in range(1, M + 1):
+        for teacher in random.sample(range(T), teachers_per_subject):
+            teacher_subjects[teacher].append(subject)
+    for subjects in teacher_subjects:
+        lines.append(" ".join(map(str, subjects + [0])))
+
+    lines.append(" ".join(str(random.randint(1, 4)) for _ in range(M)))
+    return "\n".join(lines) + "\n"
+
+
+def synthetic_problem(size):
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as file:
+        file.write(generate_instance(size))
+    try:
+        return ClassCourseTeacherAssignmentProblem(*read_input_file(file.name))
+    finally:
+        os.remove(file.name)
+
+
+def measure(function, repeat):
+    """
+    Times a call and traces its memory
+
+    :return: best wall time of `repeat` calls in seconds and peak traced bytes of one call
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak - baseline
+
+
+def choice_start(problem, row):
+    return random.choice(problem.subject_times[row[1]])
+
+
+def kernels(problem, state, constraints):
+    rows = [list(row) for row in state]
+    evaluator = DeltaEvaluator(problem, constraints)
+    evaluator.reset(state)
+    indices = list(range(len(state)))
+    starts = [choice_start(problem, row) for row in rows]
+    teachers = [row[3] for row in rows]
+
+    def change_teacher():
+        for row in rows:
+            problem.change_teacher(row)
+
+    def change_time():
+        for row in rows:
+            problem.change_time(row)
+
+    return {
+        "check_class_schedule_conflicts": lambda: problem.check_class_schedule_conflicts(
+            state
+        ),
+        "check_teacher_schedule_conflicts": lambda: problem.check_teacher_schedule_conflicts(
+            state
+        ),
+        "check_same_session_time": lambda: problem.check_same_session_time(state),
+        "check_end_time_limit": lambda: problem.check_end_time_limit(state),
+        "get_score": lambda: problem.get_score(state, constraints),
+        "find_violations": lambda: problem.find_violations(state, constraints),
+        "change_teacher": change_teacher,
+        "change_time": change_time,
+        "deepcopy": lambda: deepcopy(state),
+        "DeltaEvaluator.reset": lambda: evaluator.reset(state),
+        "DeltaEvaluator.deltas": lambda: evaluator.deltas(indices, starts, teachers),
+    }
+
+
+def print_results(results):
+    header = ("KERNEL", "SIZE", "NS/ASSIGNMENT", "PEAK BYTES/CALL")
+    rows = [
+        (
+            result["kernel"],
+            str(result["size"]),
+            f"{result['ns_per_assignment']:.1f}",
+            str(result["peak_bytes"]),
+        )
+        for result in results
+    ]
+    print(format_table(header, rows))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[1000, 10000, 100000],
+        help="number of class-subjects of the synthetic states",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="calls timed per kernel, best is kept"
+    )
+    parser.add_argument(
+        "--constraints",
+        nargs="+",
+        type=int,
+        default=[0, 1, 2, 3],
+        help="constraints for evaluating score",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--output", type=str, default=None, help="JSON file of the results"
+    )
+
+    opt = parser.parse_args()
+    random.seed(opt.seed)
+
+    results = []
+    for size in opt.sizes:
+        problem = synthetic_problem(size)
+        state = problem.initialize_state(prob=1.0)
+        for name, function in kernels(problem, state, opt.constraints).items():
+            seconds, peak = measure(function, opt.repeat)
+            results.append(
+                {
+                    "kernel": name,
+                    "size": len(state),
+                    "ns_per_assignment": seconds * 1e9 / len(state),
+                    "peak_bytes": peak,
+                }
+            )
+
+    print_results(results)
+    if opt.output is not None:
+        with open(opt.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -1,8 +1,73 @@
 import argparse
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 
-from src.model.modeling import ClassCourseTeacherAssignmentProblem
+from src.instance import parse_instance, read_input_file, read_tokens
+from src.model.modeling import ClassCourseTeacherAssignmentProblem, Schedule
+from src.utils import format_table
+
+
+def read_output(output_path):
+    # O dong (Class, Subject, Start time, Teacher)
+    output = read_tokens(output_path)
+    O = int(output[0])
+    return Schedule.from_rows(output[1 : 4 * O + 1])
+
+
+def validate(pair, constraints):
+    """
+    Validates one output against its input
+
+    :param pair: (input path, output path)
+    :return: summary of the output: score, maximum score and violations of each constraint
+    """
+    input_path, output_path = pair
+    problem = ClassCourseTeacherAssignmentProblem(*read_input_file(input_path))
+    assignments = read_output(output_path)
+    violations = problem.find_violations(assignments, constraints)
+
+    return {
+        'input': input_path,
+        'output': output_path,
+        # External outputs may start anywhere, not only at the times of subject_times
+        'max_score': problem.get_maximum_score(constraints, restricted_starts=False),
+        'score': problem.get_score(assignments, constraints, violations),
+        'violations': {constraint: len(indices) for constraint, indices in violations.items()},
+    }
+
+
+def find_pairs(directories, output_name):
+    """
+    Pairs input.txt with the output of each directory matched by a glob, directories without an output are skipped
+    """
+    pairs = []
+    for directory in sorted(glob.glob(directories)):
+        pair = (os.path.join(directory, 'input.txt'), os.path.join(directory, output_name))
+        if os.path.isfile(pair[0]) and os.path.isfile(pair[1]):
+            pairs.append(pair)
+    return pairs
+
+
+def read_manifest(manifest_path):
+    """
+    Reads one (input path, output path) pair per line, separated by whitespace
+    """
+    with open(manifest_path) as f:
+        return [tuple(line.split()) for line in f if line.strip()]
+
+
+def print_summary(summaries, constraints):
+    header = ('OUTPUT', 'MAX_SCORE', 'SCORE') + tuple(f'C{constraint}' for constraint in constraints)
+    rows = [
+        (summary['output'], str(summary['max_score']), str(summary['score']))
+        + tuple(str(summary['violations'][constraint]) for constraint in constraints)
+        for summary in summaries
+    ]
+    print(format_table(header, rows))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -13,46 +78,43 @@ if __name__ == "__main__":
                                                                \n 1 - a class cannot have two subjects taught at the same time. \
                                                                \n 2 - a teacher cannot teach two classes at the same time. \
                                                                \n 3 - last class end time must not exceed 60')
+    parser.add_argument('--report', action='store_true', help='print the assignments that violate each constraint')
+    parser.add_argument('--batch', type=str, default=None,
+                        help='validate input.txt against --output_name in every directory matched by this glob, e.g. "test/test*/"')
+    parser.add_argument('--output_name', type=str, default='pred.txt', help='output file name of each --batch directory')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='validate the (input path, output path) pairs listed one per line in this file')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='number of worker processes of a batch')
+    parser.add_argument('--summary_path', type=str, default=None, help='JSON summary written by a batch')
 
     opt = parser.parse_args()
-    
+
+    if opt.batch is not None or opt.manifest is not None:
+        pairs = find_pairs(opt.batch, opt.output_name) if opt.batch is not None else read_manifest(opt.manifest)
+        constraints = sorted(set(opt.constraints))
+        # Workers import numpy and the model once, then validate many outputs each
+        with ProcessPoolExecutor(max_workers=opt.jobs) as executor:
+            chunksize = max(1, len(pairs) // (4 * opt.jobs))
+            summaries = list(executor.map(validate, pairs, [constraints] * len(pairs), chunksize=chunksize))
+
+        print_summary(summaries, constraints)
+        if opt.summary_path is not None:
+            with open(opt.summary_path, 'w') as f:
+                json.dump(summaries, f, indent=2)
+
+        exit()
+
     # INPUT
     input_path = opt.input_path
 
-    # Đọc dữ liệu từ file txt
-    with open(input_path, 'r') as file:
-        input = file.readlines()
-
-    # Chuyển đổi dữ liệu đọc được thành các giá trị số
-    T, N, M = map(int, input[0].split())
-    class_subjects = []
-    class_subjects.append([])
-    for i in range(1, N+1):
-        subjects = list(map(int, input[i].split()))
-        class_subjects.append(subjects[:-1])
-
-    teacher_subjects = []
-    teacher_subjects.append([])
-    for i in range(N+1, N+T+1):
-        subjects = list(map(int, input[i].split()))
-        teacher_subjects.append(subjects[:-1])
-        
-    subject_periods = list(map(int, input[N+T+1].split()))
-    subject_periods.insert(0, [])
-    
+    T, N, M, class_subjects, teacher_subjects, subject_periods = parse_instance(
+        read_tokens(input_path)
+    )
+
     # OUTPUT
     output_path = opt.output_path
 
-    # Đọc dữ liệu từ file txt
-    with open(output_path, 'r') as file:
-        output = file.readlines()
-        
-    O = int(output[0])
-    
-    assignments = []
-    for i in range(1, O+1):
-        assignment = list(map(int, output[i].split()))
-        assignments.append(assignment)
+    assignments = read_output(output_path)
         
     ########## RUN #############    
     problem = ClassCourseTeacherAssignmentProblem(
@@ -60,5 +122,11 @@ if __name__ == "__main__":
     )    
     # Score
     print("SCORE: ", problem.get_score(assignments, opt.constraints))
+
+    if opt.report:
+        for constraint, indices in problem.find_violations(assignments, opt.constraints).items():
+            print(f"CONSTRAINT {constraint}: {len(indices)} violations")
+            for index in indices.tolist():
+                print(index + 1, *assignments[index])
     
     
\ No newline at end of file
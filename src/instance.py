@@ -0,0 +1,100 @@
+import sys
+
+import numpy as np
+
+from src.model.modeling import PERIODS, SESSION_PERIODS
+
+
+def read_tokens(source=None):
+    """
+    Reads a whole input in one bulk read and tokenizes the buffer into integers
+
+    :param source: path of an input file, None to read standard input
+    :return: array of the integers of the input
+    """
+    if source is None:
+        data = sys.stdin.buffer.read()
+    else:
+        with open(source, "rb") as file:
+            data = file.read()
+
+    # Whitespace separated, newlines included
+    return np.fromstring(data, dtype=np.int64, sep=" ")
+
+
+def parse_instance(tokens):
+    """
+    Parses the integers of an input: T N M, one 0-terminated subject list per
+    class then per teacher, and the number of periods of each subject
+
+    :param tokens: array of integers (see read_tokens)
+    :return: T, N, M and the class subjects, teacher subjects and subject periods
+        lists, indexed from 1 with a placeholder at index 0
+    """
+    T, N, M = tokens[:3].tolist()
+
+    # Subject ids start at 1, every 0 ends a list
+    ends = np.flatnonzero(tokens[3:] == 0)[: N + T] + 3
+    starts = np.concatenate(([3], ends[:-1] + 1))
+    values = tokens.tolist()
+    lists = [values[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+    class_subjects = [[]] + lists[:N]
+    teacher_subjects = [[]] + lists[N:]
+
+    position = int(ends[-1]) + 1 if N + T else 3
+    subject_periods = [[]] + values[position : position + M]
+
+    return T, N, M, class_subjects, teacher_subjects, subject_periods
+
+
+def build_subject_teachers(M, teacher_subjects):
+    """
+    Inverts the teacher subjects lists in one pass
+
+    :return: teachers able to teach each subject, indexed by subject
+    """
+    subject_teachers = [[] for _ in range(M + 1)]
+    for teacher, subjects in enumerate(teacher_subjects):
+        for subject in subjects:
+            subject_teachers[subject].append(teacher)
+
+    return subject_teachers
+
+
+def build_subject_times(M, subject_periods):
+    """
+    Lists the start times at which each subject ends within the same session,
+    which also keeps it within the 60 periods of the week
+
+    :return: valid start times of each subject, indexed by subject. Subjects
+        with the same number of periods share the same (read-only) list
+    """
+    times_by_periods = {}
+    subject_times = [list(range(1, PERIODS + 1))]
+    for periods in subject_periods[1 : M + 1]:
+        if periods not in times_by_periods:
+            times_by_periods[periods] = [
+                start
+                for start in range(1, PERIODS + 1)
+                if (start - 1) // SESSION_PERIODS
+                == (start + periods - 2) // SESSION_PERIODS
+            ]
+        subject_times.append(times_by_periods[periods])
+
+    return subject_times
+
+
+def read_input_file(source=None):
+    """
+    Reads an input and builds the subject teachers and subject times lists
+
+    :param source: path of an input file, None to read standard input
+    :return: arguments of ClassCourseTeacherAssignmentProblem
+    """
+    T, N, M, class_subjects, teacher_subjects, subject_periods = parse_instance(
+        read_tokens(source)
+    )
+    subject_teachers = build_subject_teachers(M, teacher_subjects)
+    subject_times = build_subject_times(M, subject_periods)
+
+    return N, T, class_subjects, subject_periods, subject_teachers, subject_times
@@ -6,6 +6,8 @@ from typing import NamedTuple
 import numpy as np
 from ortools.sat.python import cp_model
 
+from src.instance import parse_instance, read_tokens
+
 
 class Input(NamedTuple):
     T: int
@@ -17,27 +19,31 @@ class Input(NamedTuple):
     D: list
 
 
+class Eligible(NamedTuple):
+    ClassSubjects: list  # Cac mon cua moi lop, tang dan, khong trung
+    SubjectTeachers: list  # Cac giao vien day duoc moi mon, tang dan
+    Triples: list  # Cac bo (lop, mon, giao vien) hop le, tang dan
+
+
 class Variable(NamedTuple):
-    Start: np.array
-    End: np.array
-    Range: np.array
-    X: np.array
-    Mask: np.array
-    MaskT: np.array
+    # Chi co bien cho cac bo (lop, mon, giao vien) hop le
+    Start: dict
+    End: dict
+    Range: dict
+    X: dict
+    Mask: dict  # (lop, mon)
+    MaskT: dict
 
 
 def get_input():
-    T, N, M = list(map(int, input().strip().split()))
+    T, N, M, class_subjects, teacher_subjects, subject_periods = parse_instance(
+        read_tokens()
+    )
     K = 5 * 2 * 6  # So tiet hoc trong 1 tuan
-    H = []
-    for _ in range(N):
-        H.append(
-            list(map(int, input().strip().split()))[:-1]
-        )  # So tiet hoc cua mon hoc m d[m]
-    G = []
-    for _ in range(T):
-        G.append(list(map(int, input().strip().split()))[:-1])
-    D = list(map(int, input().strip().split()))
+    # Bo phan tu gia o vi tri 0
+    H = class_subjects[1:]
+    G = teacher_subjects[1:]
+    D = subject_periods[1:]  # So tiet hoc cua mon hoc m d[m]
 
     return Input(T=T, N=N, M=M, K=K, H=H, G=G, D=D)
 
@@ -49,41 +55,45 @@ def init_int_domain():
     return domains
 
 
+def init_eligible():
+    """
+    Cac bo (lop, mon, giao vien) ma lop hoc mon va giao vien day duoc mon,
+    tinh 1 lan de khong phai duyet N x M x T
+    """
+    class_subjects = [sorted(set(subjects)) for subjects in data.H]
+
+    subject_teachers = [set() for _ in range(data.M)]
+    for t, subjects in enumerate(data.G):
+        for m in subjects:
+            subject_teachers[m].add(t)
+    subject_teachers = [sorted(teachers) for teachers in subject_teachers]
+
+    triples = [
+        (n, m, t)
+        for n, subjects in enumerate(class_subjects)
+        for m in subjects
+        for t in subject_teachers[m]
+    ]
+
+    return Eligible(class_subjects, subject_teachers, triples)
+
+
 def init_variables():
-    N, M, T, K = data.N, data.M, data.T, data.K
-    X = np.zeros((N, M, T), dtype=cp_model.IntervalVar)
-    Mask = np.zeros((N, M), dtype=cp_model.IntVar)
-    MaskT = np.zeros((N, M, T), dtype=cp_model.IntVar)
-    Start = np.zeros((N, M, T), dtype=cp_model.IntVar)
-    End = np.zeros((N, M, T), dtype=cp_model.IntVar)
-    Range = np.zeros((N, M, T), dtype=cp_model.IntVar)
-
-    for n in range(N):
-        for m in range(M):
-            if m in data.H[n]:
-                Mask[n, m] = model.NewBoolVar(f"mask[{n},{m}]")
-            else:
-                Mask[n, m] = 0
-
-    for n in range(N):
-        for m in range(M):
-            for t in range(T):
-                if m in data.H[n] and m in data.G[t]:
-                    Start[n, m, t] = model.NewIntVar(0, K, f"start[{n},{m},{t}]")
-                    End[n, m, t] = model.NewIntVar(0, K, f"end[{n},{m},{t}]")
-                    Range[n, m, t] = model.NewIntVarFromDomain(
-                        domains[m], f"range[{n},{m},{t}]"
-                    )
-                    MaskT[n, m, t] = model.NewBoolVar(f"mask_t[{n},{m},{t}]")
-                    X[n, m, t] = model.NewIntervalVar(
-                        Start[n, m, t], Range[n, m, t], End[n, m, t], f"X[{n},{m},{t}]"
-                    )
-                else:
-                    Start[n, m, t] = 0
-                    End[n, m, t] = 0
-                    Range[n, m, t] = 0
-                    MaskT[n, m, t] = 0
-                    X[n, m, t] = 0
+    K = data.K
+    X, Mask, MaskT, Start, End, Range = {}, {}, {}, {}, {}, {}
+
+    for n, subjects in enumerate(eligible.ClassSubjects):
+        for m in subjects:
+            Mask[n, m] = model.NewBoolVar(f"mask[{n},{m}]")
+
+    for n, m, t in eligible.Triples:
+        Start[n, m, t] = model.NewIntVar(0, K, f"start[{n},{m},{t}]")
+        End[n, m, t] = model.NewIntVar(0, K, f"end[{n},{m},{t}]")
+        Range[n, m, t] = model.NewIntVarFromDomain(domains[m], f"range[{n},{m},{t}]")
+        MaskT[n, m, t] = model.NewBoolVar(f"mask_t[{n},{m},{t}]")
+        X[n, m, t] = model.NewIntervalVar(
+            Start[n, m, t], Range[n, m, t], End[n, m, t], f"X[{n},{m},{t}]"
+        )
 
     return Variable(Start, End, Range, X, Mask, MaskT)
 
@@ -103,35 +113,28 @@ def add_valid_time_constraint():
     """
     Thời gian bắt đầu, kết thúc phải cùng buổi
     """
-    N, M, T = data.N, data.M, data.T
-
     for n in range(data.N):
         for m in data.H[n]:
-            for t in range(data.T):
-                if m in data.G[t]:
-                    div_start = model.NewIntVar(0, 9, "")
-                    div_end = model.NewIntVar(0, 9, "")
-                    model.AddDivisionEquality(div_start, variables.Start[n, m, t], 6)
-                    model.AddDivisionEquality(div_end, variables.End[n, m, t] - 1, 6)
-                    model.Add(div_start == div_end).OnlyEnforceIf(
-                        variables.MaskT[n, m, t]
-                    )
+            for t in eligible.SubjectTeachers[m]:
+                div_start = model.NewIntVar(0, 9, "")
+                div_end = model.NewIntVar(0, 9, "")
+                model.AddDivisionEquality(div_start, variables.Start[n, m, t], 6)
+                model.AddDivisionEquality(div_end, variables.End[n, m, t] - 1, 6)
+                model.Add(div_start == div_end).OnlyEnforceIf(variables.MaskT[n, m, t])
 
 
 def add_mask_constraint():
-    N, M, T = data.N, data.M, data.T
-    for n in range(N):
+    for n in range(data.N):
         for m in data.H[n]:
             literals = []
-            for t in range(T):
-                if m in data.G[t]:
-                    model.Add(variables.Range[n, m, t] == data.D[m]).OnlyEnforceIf(
-                        variables.MaskT[n, m, t]
-                    )
-                    model.Add(variables.Range[n, m, t] == 0).OnlyEnforceIf(
-                        variables.MaskT[n, m, t].Not()
-                    )
-                    literals.append(variables.MaskT[n, m, t])
+            for t in eligible.SubjectTeachers[m]:
+                model.Add(variables.Range[n, m, t] == data.D[m]).OnlyEnforceIf(
+                    variables.MaskT[n, m, t]
+                )
+                model.Add(variables.Range[n, m, t] == 0).OnlyEnforceIf(
+                    variables.MaskT[n, m, t].Not()
+                )
+                literals.append(variables.MaskT[n, m, t])
             sum_literals = np.sum(literals, dtype=cp_model.IntVar)
             model.Add(sum_literals == 1).OnlyEnforceIf(variables.Mask[n, m])
             model.Add(sum_literals == 0).OnlyEnforceIf(variables.Mask[n, m].Not())
@@ -142,13 +145,9 @@ def add_at_most_teacher_constraint():
     Mỗi lớp-môn chỉ có thể có tối đa 1 gv.
     Nếu lớp-môn không có giáo viên thì lớp đó không được xếp lịch
     """
-    N, M, T = data.N, data.M, data.T
-    for n in range(N):
+    for n in range(data.N):
         for m in data.H[n]:
-            literals = []
-            for t in range(T):
-                if m in data.G[t]:
-                    literals.append(variables.MaskT[n, m, t])
+            literals = [variables.MaskT[n, m, t] for t in eligible.SubjectTeachers[m]]
             model.AddAtMostOne(literals)
 
 
@@ -157,22 +156,20 @@ def add_no_overlap_courses_of_class_constraint():
     for n in range(data.N):
         courses = []
         for m in data.H[n]:
-            for t in range(data.T):
-                if m in data.G[t]:
-                    courses.append(variables.X[n, m, t])
+            for t in eligible.SubjectTeachers[m]:
+                courses.append(variables.X[n, m, t])
         model.AddNoOverlap(courses)
 
 
 def add_no_overlap_class_courses_of_teacher_constraint():
     """Các lớp-môn mà cùng giáo viên dạy không trùng lịch"""
-    for t in range(data.T):
-        class_courses = []
-        for n in range(data.N):
-            for m in range(data.M):
-                if m in data.G[t] and m in data.H[n]:
-                    class_courses.append(variables.X[n, m, t])
+    # Cac bo da sap xep theo lop, mon nen lich moi giao vien giu thu tu do
+    class_courses = [[] for _ in range(data.T)]
+    for n, m, t in eligible.Triples:
+        class_courses[t].append(variables.X[n, m, t])
 
-        model.AddNoOverlap(class_courses)
+    for t in range(data.T):
+        model.AddNoOverlap(class_courses[t])
 
 
 def objective_func():
@@ -199,7 +196,7 @@ def print_result():
     for n in range(data.N):
         for m in data.H[n]:
             if solver.Value(variables.Mask[n, m]):
-                for t in range(data.T):
+                for t in eligible.SubjectTeachers[m]:
                     if solver.Value(variables.MaskT[n, m, t]):
                         start = solver.Value(variables.Start[n, m, t])
                         end = solver.Value(variables.End[n, m, t])
@@ -223,6 +220,7 @@ if __name__ == "__main__":
 
     data = get_input()
     normalize(data)
+    eligible = init_eligible()
 
     model = cp_model.CpModel()
     solver = cp_model.CpSolver()
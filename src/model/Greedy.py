@@ -1,111 +1,139 @@
 import time
+from bisect import bisect_right
+from random import choice, randrange
 
 import numpy as np
 
-start = time.time()
+from src.instance import read_input_file
+from src.model.modeling import ClassCourseTeacherAssignmentProblem, Schedule
+
+
+class GreedyConstructor:
+    """
+    Builds a conflict-free state of a ClassCourseTeacherAssignmentProblem by
+    assigning the class-subjects from the shortest to the longest, each to the
+    least busy of its teachers at the earliest start time free for both the
+    class and the teacher.
+    """
+
+    def __init__(self, problem: ClassCourseTeacherAssignmentProblem):
+        self.problem = problem
+        self.classtable = None
+        self.teacher_periods = None
+
+    # Bitmask cac tiet cua mon hoc bat dau tu start_time
+    def interval_mask(self, subject, start_time):
+        return self.problem.interval_masks[subject][start_time]
+
+    # Kiem tra giao vien co lich khong
+    def check_teacher(self, teacher, subject, start_time):
+        return not self.teacher_periods[teacher] & self.interval_mask(subject, start_time)
+
+    # Kiem tra lop co dang duoc su dung khong
+    def check_lop(self, num_class, subject, start_time):
+        return not self.classtable[num_class] & self.interval_mask(subject, start_time)
+
+    # Kiem tra giao vien phu hop voi so tiet day dang la it nhat
+    def search_candidate(self, list_candidate):
+        if len(list_candidate) == 1:
+            return list_candidate[0]
+        min = 100
+        teacher = list_candidate[0]
+        for can in list_candidate:
+            periods = bin(self.teacher_periods[can]).count("1")
+            if periods < min:
+                min = periods
+                teacher = can
+
+        return teacher
+
+    def order(self):
+        """Indices of the class-subjects in assignment order: by number of periods"""
+        periods = [self.problem.subject_periods[subject] for subject in self.problem.subjects.tolist()]
+        # Sap xep theo so tiet tang dan
+        return sorted(range(len(periods)), key=lambda index: periods[index])
+
+    def assign_classtable(self):
+        """
+        Builds a state in one greedy pass
+
+        :return: a Schedule, class-subjects without a free teacher and start time stay unassigned
+        """
+        problem = self.problem
+        # Lich cua cac lop va giao vien, moi lop / giao vien la 1 bitmask
+        self.classtable = [0] * (problem.N + 1)
+        self.teacher_periods = [0] * (problem.T + 1)
+
+        classes = problem.classes.tolist()
+        subjects = problem.subjects.tolist()
+        starts = np.zeros(len(classes), dtype=np.int16)
+        teachers = np.zeros(len(classes), dtype=np.int16)
+
+        # Duyet qua cac bo (lop, mon)
+        for index in self.order():
+            class_num, subject = classes[index], subjects[index]
 
+            # Lay danh sach giao vien phu hop
+            list_candidate = problem.subject_teachers[subject]
+            if len(list_candidate) == 0:
+                continue
 
-# Kiem tra giao vien co lich khong
-def check_teacher(teacher, start_time, periods):
-    end_time = start_time + periods
-    return np.all(teacher_periods[teacher - 1, start_time : end_time + 1] == 0)
-
-
-# Kiem tra thoi gian chung 1 buoi khong
-def check_time(start_time, periods):
-    end_time = start_time + periods
-    end_time = int(end_time / 6)
-    start_time = int(start_time / 6)
-    if start_time == end_time:
-        return True
-
-    return False
-
-
-# Kiem tra giao vien phu hop voi so tiet day dang la it nhat
-def search_candidate(list_candidate):
-    if len(list_candidate) == 1:
-        return list_candidate[0]
-    min = 100
-    teacher = list_candidate[0]
-    for can in list_candidate:
-        unique_values = np.unique(teacher_periods[can])
-        periods = np.count_nonzero(unique_values)
-        if periods < min:
-            min = periods
-            teacher = can
-
-    return teacher
+            teacher = self.search_candidate(list_candidate)
 
+            # Kiem tra tung thoi gian bat dau hop le (cung buoi, khong qua tiet 60)
+            for start_time in problem.subject_times[subject]:
+                if self.check_lop(class_num, subject, start_time) and self.check_teacher(
+                    teacher, subject, start_time
+                ):
+                    starts[index] = start_time
+                    teachers[index] = teacher
 
-# Kiem tra lop co dang duoc su dung khong
-def check_lop(num_class, start_time, periods):
-    end_time = start_time + periods
-    return np.all(classtable[num_class - 1, start_time : end_time + 1] == 0)
+                    # Them tiet vao phan cong
+                    self.classtable[class_num] |= self.interval_mask(subject, start_time)
+                    self.teacher_periods[teacher] |= self.interval_mask(subject, start_time)
+                    break
 
+        return Schedule(problem.classes, problem.subjects, starts, teachers)
 
-def assign_classtable(T, N, M, class_subjects, teacher_subjects, subject_periods):
-    # Xay dung cac bo theo dang (lop, mon, so tiet cua mon)
-    class_subjects_list = []
-    for i in range(N):
-        subjects = class_subjects[i]
-        for subject in subjects:
-            class_subjects_list.append((i + 1, subject, subject_periods[subject - 1]))
 
-    # Sap xep theo so tiet tang dan
-    class_subjects_list.sort(key=lambda x: x[2], reverse=False)
+class RandomizedGreedyConstructor(GreedyConstructor):
+    """
+    GRASP construction: the next class-subject and its teacher are drawn at
+    random from a restricted candidate list (RCL) instead of taking the
+    greedy choice. The RCL holds the candidates whose number of periods
+    (class-subjects) or booked periods (teachers) is within
+    alpha * (max - min) of the minimum.
+    """
 
-    # Duyet qua cac bo
-    for k, class_subject in enumerate(class_subjects_list):
-        class_num, subject, periods = class_subject
-        assigned_teacher = None
-        list_candidate = []
+    def __init__(self, problem: ClassCourseTeacherAssignmentProblem, alpha=0.3):
+        """
+        :param alpha: 0 only draws ties of the greedy choice, 1 draws among all candidates
+        """
+        super().__init__(problem)
+        self.alpha = alpha
 
-        for t in range(T):
-            # Lay danh sach giao vien phu hop
-            if subject in teacher_subjects[t]:
-                list_candidate.append(t)
-
-        if len(list_candidate) == 0:
-            continue
-
-        teacher = search_candidate(list_candidate=list_candidate) + 1
-
-        for i in range(60):
-            # Kiem tra tung tiet
-            if (
-                check_lop(class_num, i, periods)
-                and check_teacher(teacher, i, periods)
-                and check_time(i, periods)
-            ):
-                assigned_teacher = teacher
-                class_subjects_list[k] = class_subject + (
-                    i + 1,
-                    teacher,
-                )
-
-                for index in range(i, i + periods + 1):
-                    # Them tiet vao phan cong
-                    classtable[class_num - 1, index] = 1
-                    teacher_periods[teacher - 1, index] = i
+    def search_candidate(self, list_candidate):
+        if len(list_candidate) == 1:
+            return list_candidate[0]
+        loads = [bin(self.teacher_periods[can]).count("1") for can in list_candidate]
+        threshold = min(loads) + self.alpha * (max(loads) - min(loads))
 
-                break
-            if assigned_teacher is not None:
-                break
+        return choice([can for can, load in zip(list_candidate, loads) if load <= threshold])
 
-    # Ouput
-    class_subjects_list.sort(key=lambda x: x[0])
-    count = 0
-    for c in class_subjects_list:
-        if len(c) == 5:
-            count += 1
+    def order(self):
+        # Remaining class-subjects sorted by number of periods, the RCL is a prefix
+        remaining = super().order()
+        subjects = self.problem.subjects.tolist()
+        periods = [self.problem.subject_periods[subjects[index]] for index in remaining]
 
-    print(count)
-    for c in class_subjects_list:
-        if len(c) == 5:
-            print(c[0], c[1], c[3], c[4])
+        order = []
+        while remaining:
+            threshold = periods[0] + self.alpha * (periods[-1] - periods[0])
+            pick = randrange(bisect_right(periods, threshold))
+            order.append(remaining.pop(pick))
+            periods.pop(pick)
 
-    # print(teacher_periods)
+        return order
 
 
 """
@@ -123,47 +151,26 @@ Input:
 """
 
 
-# Read_from_file
-# file_path = "/home/hieunguyen/DHBK/tulkh/phan_cong/Test-cases/Test cases/test10/input.txt"
-
-# with open(file_path, 'r') as file:
-#     lines = file.readlines()
-
-# # Chuyển đổi dữ liệu đọc được thành các giá trị số
-# T, N, M = map(int, lines[0].split())
-# class_subjects = []
-# for i in range(1, N+1):
-#     subjects = list(map(int, lines[i].split()))
-#     class_subjects.append(subjects[:-1])
-
-# teacher_subjects = []
-# for i in range(N+1, N+T+1):
-#     subjects = list(map(int, lines[i].split()))
-#     teacher_subjects.append(subjects[:-1])
-
-# subject_periods = list(map(int, lines[N+T+1].split()))
-
-# Read from keyboard
-T, N, M = map(int, input().split())
-class_subjects = []
-for _ in range(N):
-    subjects = list(map(int, input().split()))
-    class_subjects.append(subjects[:-1])
-teacher_subjects = []
-for _ in range(T):
-    subjects = list(map(int, input().split()))
-    teacher_subjects.append(subjects[:-1])
-subject_periods = list(map(int, input().split()))
-
-classtable = np.zeros(
-    (N, 60), dtype=int
-)  # Mang luu trang thai cua cac lop tu tiet 1-60
-teacher_periods = np.zeros(
-    (T, 60), dtype=int
-)  # Mang luu trang thai cua cac giao vien tu tiet 1-60
-
-# Sovle
-assign_classtable(T, N, M, class_subjects, teacher_subjects, subject_periods)
-end = time.time()
-
-print(end - start)
+if __name__ == "__main__":
+    # Run from the repository root: python -m src.model.Greedy < input.txt
+    start = time.time()
+
+    # Read from keyboard
+    N, T, class_subjects, subject_periods, subject_teachers, subject_times = read_input_file()
+
+    problem = ClassCourseTeacherAssignmentProblem(
+        N, T, class_subjects, subject_periods, subject_teachers, subject_times
+    )
+
+    # Sovle
+    state = GreedyConstructor(problem).assign_classtable()
+
+    # Ouput
+    assigned = [row for row in state if row[2] and row[3]]
+    print(len(assigned))
+    for row in assigned:
+        print(*row)
+
+    end = time.time()
+
+    print(end - start)
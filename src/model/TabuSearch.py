@@ -1,8 +1,61 @@
 from abc import ABCMeta, abstractmethod
-from collections import deque
 from copy import deepcopy
+from random import getstate, setstate
+from time import perf_counter
 
-from numpy import argmax
+from numpy import argsort, asarray
+
+from src.model.callbacks import (
+    NO_SUITABLE_NEIGHBORS,
+    REACHED_MAXIMUM_SCORE,
+    REACHED_MAXIMUM_STEPS,
+    REACHED_TIME_LIMIT,
+    STOPPED,
+    ConsoleReporter,
+)
+from src.model.profiling import NULL_STATS, SearchStats
+
+
+class TabuList:
+    """
+    Tabu memory with O(1) membership test whatever the tenure.
+
+    Behaves like a deque(maxlen=tenure) of attributes: an attribute is tabu
+    while it is among the last `tenure` appended ones. Each attribute keeps
+    the append count until which it stays tabu instead of being scanned for.
+    """
+
+    def __init__(self, tenure):
+        """
+        :param tenure: number of appends an attribute stays tabu for
+        """
+        self.tenure = tenure
+        self.appends = 0
+        self.tabu_until = {}
+
+    def __contains__(self, attribute):
+        return self.tabu_until.get(attribute, -1) >= self.appends
+
+    def __len__(self):
+        return min(self.appends, self.tenure)
+
+    def append(self, attribute):
+        """
+        Makes an attribute tabu for the next `tenure` appends
+
+        :param attribute: any hashable attribute of a move
+        :return: None
+        """
+        self.tabu_until[attribute] = self.appends + self.tenure
+        self.appends += 1
+
+        # Drop expired attributes so memory stays proportional to the tenure
+        if len(self.tabu_until) > 2 * self.tenure:
+            self.tabu_until = {
+                attribute: until
+                for attribute, until in self.tabu_until.items()
+                if until >= self.appends
+            }
 
 
 class TabuSearch:
@@ -21,11 +74,23 @@ class TabuSearch:
 
     initial_state = None
     current = None
+    current_score = None
     best = None
+    best_score = None
 
     max_steps = None
     max_score = None
 
+    time_limit = None
+
+    stop_event = None
+
+    stats = None
+
+    callbacks = None
+
+    checkpointer = None
+
     def __init__(
         self,
         initial_state,
@@ -35,12 +100,22 @@ class TabuSearch:
         constraints=[0, 1, 2, 3],
         print_interval=100,
         max_score=None,
+        stop_event=None,
+        collect_stats=False,
+        callbacks=None,
+        time_limit=None,
+        checkpointer=None,
     ):
         """
         :param initial_state: initial state, should implement __eq__ or __cmp__
         :param tabu_size: number of states to keep in tabu list
         :param max_steps: maximum number of steps to run algorithm for
         :param max_score: score to stop algorithm once reached
+        :param stop_event: event (e.g. multiprocessing.Event) to stop algorithm once set
+        :param collect_stats: record time and calls of each phase in self.stats
+        :param callbacks: list of SearchCallback receiving the events of the run
+        :param time_limit: seconds after which the run stops and returns the best state so far
+        :param checkpointer: Checkpointer periodically saving the state of the run
         """
         self.initial_state = initial_state
 
@@ -72,6 +147,17 @@ class TabuSearch:
             else:
                 raise TypeError("Maximum score must be a numeric type")
 
+        if time_limit is not None:
+            if isinstance(time_limit, (int, float)) and time_limit >= 0:
+                self.time_limit = float(time_limit)
+            else:
+                raise TypeError("Time limit must be a non-negative number")
+
+        self.stop_event = stop_event
+        self.collect_stats = collect_stats
+        self.callbacks = list(callbacks) if callbacks is not None else []
+        self.checkpointer = checkpointer
+
     def __str__(self):
         return (
             "TABU SEARCH: \n"
@@ -81,8 +167,8 @@ class TabuSearch:
             + "BEST MEMBER: %s \n\n"
         ) % (
             self.cur_steps,
-            self._score(self.current),
-            self._score(self.best),
+            self.current_score,
+            self.best_score,
             str(self.best),
         )
 
@@ -96,10 +182,61 @@ class TabuSearch:
         :return: None
         """
         self.cur_steps = 0
-        self.tabu_list = deque(maxlen=self.tabu_size)
+        self.tabu_list = TabuList(self.tabu_size)
+        self.stats = SearchStats() if self.collect_stats else None
         self.current = self.initial_state
         self.best = self.initial_state
 
+    def _checkpoint(self):
+        """
+        Returns everything needed to continue the run from the current step
+
+        :return: picklable state of the run
+        """
+        return {
+            "steps": self.cur_steps,
+            "current": self.current,
+            "current_score": self.current_score,
+            "best": self.best,
+            "best_score": self.best_score,
+            "tabu_list": self.tabu_list,
+            "random_state": getstate(),
+        }
+
+    def _restore(self, checkpoint):
+        """
+        Continues the run from a state returned by _checkpoint
+
+        :param checkpoint: state of a run
+        :return: None
+        """
+        self.cur_steps = checkpoint["steps"]
+        self.current = checkpoint["current"]
+        self.current_score = checkpoint["current_score"]
+        self.best = checkpoint["best"]
+        self.best_score = checkpoint["best_score"]
+        self.tabu_list = checkpoint["tabu_list"]
+        setstate(checkpoint["random_state"])
+
+    def _move(self, neighbor, attribute):
+        """
+        Makes a member of the neighborhood the current state
+
+        :param neighbor: member of the neighborhood
+        :param attribute: changed attribute of the neighbor
+        :return: None
+        """
+        self.current = neighbor
+
+    def _copy(self, neighbor):
+        """
+        Returns a standalone copy of a member of the neighborhood
+
+        :param neighbor: member of the neighborhood
+        :return: state of the neighbor
+        """
+        return deepcopy(neighbor)
+
     @abstractmethod
     def _score(self, state):
         """
@@ -119,66 +256,124 @@ class TabuSearch:
         """
         pass
 
-    def _best(self, neighborhood, attribute_change):
+    def _rescore(self, state, score):
         """
-        Finds the best member of a neighborhood
+        Returns the score a state is kept as best and reported by, given the
+        score it is ranked by. Both are the same unless _score is a faster
+        stand-in that only ranks the neighbors.
+
+        :param state: a state
+        :param score: objective function value of state
+        :return: reported score of state
+        """
+        return score
+
+    def _evaluate(self, neighborhood):
+        """
+        Returns objective function values of all members of a neighborhood
 
         :param neighborhood: a neighborhood
-        :return: best member of neighborhood
+        :return: list of objective function values
         """
+        return [self._score(x) for x in neighborhood]
 
-        indices = argmax([self._score(x) for x in neighborhood])
+    def _rank(self, scores):
+        """
+        Ranks the members of a neighborhood from best to worst
 
-        return neighborhood[indices], attribute_change[indices]
+        :param scores: objective function values of the neighborhood
+        :return: indices of the members, best first and ties in neighborhood order
+        """
+        return argsort(-asarray(scores), kind="stable")
 
-    def run(self, verbose=True):
+    def run(self, verbose=True, resume=None):
         """
         Conducts tabu search
 
-        :param verbose: indicates whether or not to print progress regularly
+        :param verbose: indicates whether or not to print progress every print_interval steps
+        :param resume: state saved by a checkpoint to continue from, None to start over
         :return: best state and objective function value of best state
         """
         self._clear()
-        for i in range(self.max_steps):
-            self.cur_steps += 1
+        self.current_score = self._rescore(self.current, self._score(self.current))
+        self.best_score = self.current_score
+        if resume is not None:
+            self._restore(resume)
+        stats = self.stats or NULL_STATS
+        callbacks = self.callbacks
+        if verbose:
+            callbacks = callbacks + [ConsoleReporter(self.print_interval)]
+        for callback in callbacks:
+            callback.on_start(self)
+        if self.time_limit is not None:
+            deadline = perf_counter() + self.time_limit
+
+        for i in range(self.cur_steps, self.max_steps):
+            # Checked before the step starts so that cur_steps only counts steps run
+            if self.stop_event is not None and self.stop_event.is_set():
+                return self._terminate(callbacks, STOPPED)
+            if self.time_limit is not None and perf_counter() >= deadline:
+                return self._terminate(callbacks, REACHED_TIME_LIMIT)
 
-            if ((i + 1) % self.print_interval == 0) and verbose:
-                print(self)
+            self.cur_steps += 1
 
+            started = stats.clock()
             neighborhood, attribute_change = self._neighborhood()
-            neighborhood_best, attribute_change_best = self._best(
-                neighborhood, attribute_change
-            )
-
-            while True:
-                if all([x in self.tabu_list for x in attribute_change]):
-                    print("TERMINATING - NO SUITABLE NEIGHBORS")
-                    return self.best, self._score(self.best)
-                if attribute_change_best in self.tabu_list:
+            started = stats.add("neighborhood", started)
+            scores = self._evaluate(neighborhood)
+            started = stats.add("scoring", started, len(neighborhood))
+
+            if all(x in self.tabu_list for x in attribute_change):
+                return self._terminate(callbacks, NO_SUITABLE_NEIGHBORS)
+            stats.add("tabu_checks", started, len(attribute_change))
+
+            # Walk the candidates from best to worst, at least one of them is not tabu.
+            # Ranking scores never exceed the reported ones, a neighbor ranked above
+            # the best score is better than the best state
+            best_score = self.best_score
+            for index in self._rank(scores):
+                if attribute_change[index] in self.tabu_list:
                     # aspriration criteria
-                    if self._score(neighborhood_best) > self._score(self.best):
-                        self.tabu_list.append(attribute_change_best)
-                        self.best = deepcopy(neighborhood_best)
+                    if scores[index] > self.best_score:
+                        self.tabu_list.append(attribute_change[index])
+                        started = stats.clock()
+                        self.best = self._copy(neighborhood[index])
+                        stats.add("best_copies", started)
+                        self.best_score = self._rescore(self.best, scores[index])
                         break
-                    else:
-                        neighborhood.remove(neighborhood_best)
-                        attribute_change.remove(attribute_change_best)
-                        neighborhood_best, attribute_change_best = self._best(
-                            neighborhood, attribute_change
-                        )
+                    stats.add("aspiration_retries")
                 else:
-                    self.tabu_list.append(attribute_change_best)
-                    self.current = neighborhood_best
-                    if self._score(self.current) > self._score(self.best):
+                    self.tabu_list.append(attribute_change[index])
+                    self._move(neighborhood[index], attribute_change[index])
+                    self.current_score = self._rescore(self.current, scores[index])
+                    if self.current_score > self.best_score:
+                        started = stats.clock()
                         self.best = deepcopy(self.current)
+                        stats.add("best_copies", started)
+                        self.best_score = self.current_score
                     break
 
             # print(self.tabu_list)
 
-            if self.max_score is not None and self._score(self.best) >= self.max_score:
-                if verbose:
-                    print("TERMINATING - REACHED MAXIMUM SCORE")
-                return self.best, self._score(self.best)
-        if verbose:
-            print("TERMINATING - REACHED MAXIMUM STEPS")
-        return self.best, self._score(self.best)
+            for callback in callbacks:
+                callback.on_step(self.cur_steps, self.current_score, self.best_score)
+                if self.best_score > best_score:
+                    callback.on_improvement(self.cur_steps, self.best_score)
+
+            if self.max_score is not None and self.best_score >= self.max_score:
+                return self._terminate(callbacks, REACHED_MAXIMUM_SCORE)
+
+            if self.checkpointer is not None and self.checkpointer.due():
+                self.checkpointer.save(self._checkpoint())
+        return self._terminate(callbacks, REACHED_MAXIMUM_STEPS)
+
+    def _terminate(self, callbacks, reason):
+        """
+        Notifies the callbacks of the end of the run
+
+        :param reason: termination reason (see src.model.callbacks)
+        :return: best state and objective function value of best state
+        """
+        for callback in callbacks:
+            callback.on_terminate(self.cur_steps, self.best_score, reason)
+        return self.best, self.best_score
@@ -1,7 +1,10 @@
 from copy import deepcopy
 from random import randint
 
-from src.model.modeling import ClassCourseTeacherAssignmentProblem
+import numpy as np
+
+from src.model.evaluator import DeltaEvaluator
+from src.model.modeling import ClassCourseTeacherAssignmentProblem, Move
 from src.model.TabuSearch import TabuSearch
 
 
@@ -21,7 +24,20 @@ class TabuSearchAlgorithm(TabuSearch):
         constraints=[0, 1, 2],
         print_interval=100,
         max_score=None,
+        tabu_attribute="index",
+        stop_event=None,
+        collect_stats=False,
+        callbacks=None,
+        time_limit=None,
+        checkpointer=None,
+        full_validation=False,
     ):
+        """
+        :param tabu_attribute: attribute of a move made tabu, either "index" of the
+            changed class-subject or the whole "move" (index, start time, teacher)
+        :param full_validation: score every constraint, including the ones implied by
+            the move operators (see ClassCourseTeacherAssignmentProblem.compile_constraints)
+        """
         super().__init__(
             initial_state,
             tabu_tenure,
@@ -30,68 +46,84 @@ class TabuSearchAlgorithm(TabuSearch):
             constraints,
             print_interval,
             max_score,
+            stop_event,
+            collect_stats,
+            callbacks,
+            time_limit,
+            checkpointer,
         )
         self.problem = problem
+        if tabu_attribute in ("index", "move"):
+            self.tabu_attribute = tabu_attribute
+        else:
+            raise ValueError('Tabu attribute must be "index" or "move"')
         self.CHANGE_STRATEGY = [
             problem.change_teacher,
             problem.change_time,
             problem.change_both,
         ]
+        if not full_validation:
+            constraints = problem.compile_constraints(constraints)
+        self.evaluator = DeltaEvaluator(problem, constraints)
+
+    def _clear(self):
+        super()._clear()
+        # Moves are applied to current in place
+        self.current = deepcopy(self.initial_state)
+        self.evaluator.reset(self.current)
+
+    def _restore(self, checkpoint):
+        super()._restore(checkpoint)
+        self.evaluator.reset(self.current)
+
+    def _rescore(self, state, score):
+        # The evaluator counts doubly-booked periods to rank the neighbors,
+        # which is the score of the problem checkers only without conflict
+        if state is self.current and self.evaluator.conflicts == 0:
+            return score
+        return self.problem.get_score(state, self.constraints)
+
+    def _move(self, move, attribute):
+        self.evaluator.apply(*move)
+        self.problem.apply_move(self.current, move)
+
+    def _copy(self, move):
+        undo = self.problem.apply_move(self.current, move)
+        state = deepcopy(self.current)
+        self.problem.apply_move(self.current, undo)
+
+        return state
+
+    def _evaluate(self, neighborhood):
+        moves = np.array(neighborhood, dtype=int).reshape(-1, 3)
+        return self.evaluator.score + self.evaluator.deltas(
+            moves[:, 0], moves[:, 1], moves[:, 2]
+        )
 
     def _neighborhood(self):
         neighborhood = []
         attribute_change = []
         for _ in range(self.neighborhood_size):
-            neighbor = deepcopy(self.current)
             # Find neighbor by randomly change start_time or teacher or both in one random class-subject
-            choice = randint(0, len(neighbor) - 1)
-            candidate = neighbor[choice]
+            choice = randint(0, len(self.current) - 1)
+            candidate = list(self.current[choice])
             if candidate[2] * candidate[3] == 0:
                 change_strategy_choice = 2
             else:
                 change_strategy_choice = randint(0, 2)
             self.CHANGE_STRATEGY[change_strategy_choice](candidate)
 
-            neighborhood.append(neighbor)
-            # attribute_change.append((choice, candidate[2], candidate[3]))
-            attribute_change.append((choice))
+            move = Move(choice, candidate[2], candidate[3])
+            neighborhood.append(move)
+            if self.tabu_attribute == "move":
+                attribute_change.append(move)
+            else:
+                attribute_change.append(choice)
         return neighborhood, attribute_change
 
     def _score(self, assignments):
-        score = 0
-        # Penalty
-        if 0 in self.constraints:
-            session_violations = self.problem.check_same_session_time(assignments)
-        else:
-            session_violations = 0
-
-        if 1 in self.constraints:
-            class_violations = self.problem.check_class_schedule_conflicts(assignments)
-        else:
-            class_violations = 0
-
-        if 2 in self.constraints:
-            teacher_violations = self.problem.check_teacher_schedule_conflicts(
-                assignments
-            )
-        else:
-            teacher_violations = 0
-
-        if 3 in self.constraints:
-            endtimelimit_violations = self.problem.check_end_time_limit(assignments)
-        else:
-            endtimelimit_violations = 0
-
-        score -= 100 * (
-            session_violations
-            + class_violations
-            + teacher_violations
-            + endtimelimit_violations
-        )
-
-        # Score
-        for assignment in assignments:
-            if assignment[2] and assignment[3]:
-                score += 1
-
-        return score
+        if isinstance(assignments, Move):
+            return self.evaluator.score + self.evaluator.delta(*assignments)
+        if assignments is self.current:
+            return self.evaluator.score
+        return self.evaluator.evaluate(assignments)
@@ -0,0 +1,282 @@
+from collections import defaultdict, deque
+
+import numpy as np
+
+from src.model.modeling import PERIODS, SESSION_PERIODS, SESSIONS
+
+
+def minimum_sessions(periods):
+    """
+    Martello-Toth lower bound (L2) on the number of sessions needed to hold
+    lessons that cannot cross sessions
+
+    :param periods: number of periods of each lesson
+    :return: number of sessions below which the lessons cannot fit
+    """
+    bound = 0
+    for alpha in range(SESSION_PERIODS // 2 + 1):
+        # Lessons longer than SESSION_PERIODS - alpha share their session with nothing of length >= alpha
+        large = [p for p in periods if p > SESSION_PERIODS - alpha]
+        medium = [
+            p for p in periods if SESSION_PERIODS / 2 < p <= SESSION_PERIODS - alpha
+        ]
+        small = [p for p in periods if alpha <= p <= SESSION_PERIODS / 2]
+        # Periods of the small lessons that do not fit next to the medium ones
+        overflow = sum(small) - (len(medium) * SESSION_PERIODS - sum(medium))
+        bound = max(
+            bound,
+            len(large) + len(medium) + max(0, -(-overflow // SESSION_PERIODS)),
+        )
+
+    return bound
+
+
+def capacity(periods, placement=(0, 3)):
+    """
+    Returns an upper bound on the number of lessons a class or a teacher can
+    hold without overlapping
+
+    :param periods: number of periods of each lesson
+    :param placement: constraints every lesson satisfies: 0 keeps it within one
+        of the 10 sessions, 3 within the 60 periods of the week
+    :return: largest number of the shortest lessons that are not proven not to fit
+    """
+    periods = sorted(periods)
+    if 0 not in placement:
+        if 3 not in placement:
+            # Periods past the week are not booked, every lesson still takes its start period
+            return min(len(periods), PERIODS)
+        # The shortest lessons back to back
+        return int(np.searchsorted(np.cumsum(periods), PERIODS, side="right"))
+
+    # The shortest lessons fit whenever any lessons do, search the largest count of them
+    low, high = 0, len(periods)
+    while low < high:
+        count = (low + high + 1) // 2
+        if minimum_sessions(periods[:count]) <= SESSIONS:
+            low = count
+        else:
+            high = count - 1
+
+    return low
+
+
+def placement_constraints(problem, constraints, restricted_starts=True):
+    """
+    Returns the constraints on the start times that every lesson of the best
+    states satisfies: the scored ones, since removing a violating lesson
+    raises the score, and with restricted_starts the ones implied by
+    subject_times
+    """
+    placement = set(constraints) & {0, 3}
+    if restricted_starts:
+        placement |= problem.implied_constraints
+
+    return placement
+
+
+def assignable_pairs(problem, placement=(0, 3), restricted_starts=True):
+    """
+    Returns the indices of the class-subjects that have a teacher and a start
+    time: one of subject_times with restricted_starts, else any start time at
+    which the lesson satisfies the placement constraints
+    """
+    if 0 in placement:
+        limit = SESSION_PERIODS
+    elif 3 in placement:
+        limit = PERIODS
+    else:
+        limit = None
+
+    pairs = []
+    for index, subject in enumerate(problem.subjects.tolist()):
+        if restricted_starts:
+            fits = len(problem.subject_times[subject]) > 0
+        else:
+            fits = limit is None or problem.subject_periods[subject] <= limit
+        if problem.subject_teachers[subject] and fits:
+            pairs.append(index)
+
+    return pairs
+
+
+def class_capacities(problem, pairs, placement=(0, 3)):
+    """
+    Returns the number of lessons each class can hold in its 60 periods
+    """
+    periods = defaultdict(list)
+    classes, subjects = problem.classes.tolist(), problem.subjects.tolist()
+    for index in pairs:
+        periods[classes[index]].append(problem.subject_periods[subjects[index]])
+
+    return {
+        class_n: capacity(lessons, placement) for class_n, lessons in periods.items()
+    }
+
+
+def teacher_capacities(problem, pairs, placement=(0, 3)):
+    """
+    Returns the number of lessons each teacher can teach in its 60 periods
+    among the class-subjects it is able to teach
+    """
+    periods = defaultdict(list)
+    subjects = problem.subjects.tolist()
+    for index in pairs:
+        for teacher in problem.subject_teachers[subjects[index]]:
+            periods[teacher].append(problem.subject_periods[subjects[index]])
+
+    return {
+        teacher: capacity(lessons, placement) for teacher, lessons in periods.items()
+    }
+
+
+def capacity_bound(problem, constraints=(1, 2), restricted_starts=True):
+    """
+    Upper bound on the number of assigned class-subjects: no more than the
+    assignable ones, the lessons every class can hold (constraint 1) or the
+    lessons every teacher can teach (constraint 2)
+    """
+    placement = placement_constraints(problem, constraints, restricted_starts)
+    pairs = assignable_pairs(problem, placement, restricted_starts)
+    bound = len(pairs)
+    if 1 in constraints:
+        bound = min(bound, sum(class_capacities(problem, pairs, placement).values()))
+    if 2 in constraints:
+        bound = min(bound, sum(teacher_capacities(problem, pairs, placement).values()))
+
+    return bound
+
+
+def flow_bound(problem, constraints=(1, 2), restricted_starts=True):
+    """
+    Upper bound on the number of assigned class-subjects given by the maximum
+    flow source -> class -> class-subject -> teacher -> sink, where classes and
+    teachers are limited to their capacity and class-subjects to one lesson.
+    Tighter than capacity_bound since a class-subject counts for one teacher only.
+    """
+    placement = placement_constraints(problem, constraints, restricted_starts)
+    pairs = assignable_pairs(problem, placement, restricted_starts)
+    classes, subjects = problem.classes.tolist(), problem.subjects.tolist()
+    class_capacity = class_capacities(problem, pairs, placement)
+    teacher_capacity = teacher_capacities(problem, pairs, placement)
+    # Unscored conflicts do not limit the number of lessons
+    if 1 not in constraints:
+        class_capacity = {class_n: len(pairs) for class_n in class_capacity}
+    if 2 not in constraints:
+        teacher_capacity = {teacher: len(pairs) for teacher in teacher_capacity}
+
+    # Nodes: source, classes, class-subjects, teachers, sink
+    class_node = {class_n: 1 + i for i, class_n in enumerate(class_capacity)}
+    pair_node = {index: 1 + len(class_node) + i for i, index in enumerate(pairs)}
+    teacher_node = {
+        teacher: 1 + len(class_node) + len(pair_node) + i
+        for i, teacher in enumerate(teacher_capacity)
+    }
+    source, sink = 0, 1 + len(class_node) + len(pair_node) + len(teacher_node)
+
+    network = FlowNetwork(sink + 1)
+    for class_n, node in class_node.items():
+        network.add_edge(source, node, class_capacity[class_n])
+    for index, node in pair_node.items():
+        network.add_edge(class_node[classes[index]], node, 1)
+        for teacher in problem.subject_teachers[subjects[index]]:
+            network.add_edge(node, teacher_node[teacher], 1)
+    for teacher, node in teacher_node.items():
+        network.add_edge(node, sink, teacher_capacity[teacher])
+
+    return network.max_flow(source, sink)
+
+
+def upper_bound(problem, constraints=(1, 2), flow=False, restricted_starts=True):
+    """
+    Returns an upper bound on the score of the problem. An assignment beyond
+    the capacity of a class or a teacher costs a 100 penalty, so the best
+    states are conflict-free and assign no more than the bound.
+
+    :param constraints: scored constraints, only their conflicts limit the bound
+    :param flow: also solve the flow relaxation, tighter but slower
+    :param restricted_starts: states take their start times from subject_times
+        (as in the search), so they also satisfy the constraints implied by it.
+        False for states read from elsewhere, e.g. outputs being validated
+    :return: largest number of class-subjects a conflict-free state can assign
+    """
+    bound = capacity_bound(problem, constraints, restricted_starts)
+    if flow:
+        bound = min(bound, flow_bound(problem, constraints, restricted_starts))
+
+    return bound
+
+
+class FlowNetwork:
+    """
+    Directed graph with integer capacities, maximum flow by Dinic's algorithm
+    """
+
+    def __init__(self, size):
+        self.size = size
+        # Edge i goes to heads[i] with capacities[i] left, edge i ^ 1 is its reverse
+        self.heads = []
+        self.capacities = []
+        self.edges = [[] for _ in range(size)]
+
+    def add_edge(self, tail, head, capacity):
+        self.edges[tail].append(len(self.heads))
+        self.heads.append(head)
+        self.capacities.append(capacity)
+        self.edges[head].append(len(self.heads))
+        self.heads.append(tail)
+        self.capacities.append(0)
+
+    def _levels(self, source, sink):
+        """Breadth-first distances from the source over edges with capacity left"""
+        levels = [-1] * self.size
+        levels[source] = 0
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for edge in self.edges[node]:
+                head = self.heads[edge]
+                if self.capacities[edge] and levels[head] < 0:
+                    levels[head] = levels[node] + 1
+                    queue.append(head)
+
+        return levels if levels[sink] >= 0 else None
+
+    def _augment(self, source, sink, levels, next_edge):
+        """Pushes one unit of flow along a shortest path, returns whether it found one"""
+        path = []
+        node = source
+        while node != sink:
+            edges = self.edges[node]
+            while next_edge[node] < len(edges):
+                edge = edges[next_edge[node]]
+                head = self.heads[edge]
+                if self.capacities[edge] and levels[head] == levels[node] + 1:
+                    break
+                next_edge[node] += 1
+            else:
+                # Dead end, retreat
+                if not path:
+                    return False
+                levels[node] = -1
+                node = self.heads[path.pop() ^ 1]
+                continue
+            path.append(edge)
+            node = head
+
+        for edge in path:
+            self.capacities[edge] -= 1
+            self.capacities[edge ^ 1] += 1
+
+        return True
+
+    def max_flow(self, source, sink):
+        flow = 0
+        levels = self._levels(source, sink)
+        while levels is not None:
+            next_edge = [0] * self.size
+            while self._augment(source, sink, levels, next_edge):
+                flow += 1
+            levels = self._levels(source, sink)
+
+        return flow
@@ -0,0 +1,133 @@
+import json
+from time import perf_counter
+
+# Reasons TabuSearch.run terminates for
+STOPPED = "stopped"
+NO_SUITABLE_NEIGHBORS = "no_suitable_neighbors"
+REACHED_MAXIMUM_SCORE = "reached_maximum_score"
+REACHED_MAXIMUM_STEPS = "reached_maximum_steps"
+REACHED_TIME_LIMIT = "reached_time_limit"
+
+
+class SearchCallback:
+    """
+    Receives the events of TabuSearch.run, every event is ignored by default.
+
+    Events only carry the scores the search already holds, handling them
+    costs no scoring and no formatting of states.
+    """
+
+    def on_start(self, search):
+        """
+        Called once the search is reset, before the first step
+
+        :param search: the running TabuSearch
+        :return: None
+        """
+        pass
+
+    def on_step(self, step, current_score, best_score):
+        """
+        Called after each step
+
+        :param step: number of steps run
+        :param current_score: score of the current state
+        :param best_score: score of the best state
+        :return: None
+        """
+        pass
+
+    def on_improvement(self, step, best_score):
+        """
+        Called when a step finds a new best state
+
+        :param step: number of steps run, including the improving one
+        :param best_score: score of the new best state
+        :return: None
+        """
+        pass
+
+    def on_terminate(self, step, best_score, reason):
+        """
+        Called once when the search ends
+
+        :param step: number of steps run
+        :param best_score: score of the returned state
+        :param reason: one of the termination reasons of this module
+        :return: None
+        """
+        pass
+
+
+class ConsoleReporter(SearchCallback):
+    """
+    Prints one line of scores every `interval` steps and the termination reason
+    """
+
+    MESSAGES = {
+        STOPPED: "TERMINATING - STOPPED",
+        NO_SUITABLE_NEIGHBORS: "TERMINATING - NO SUITABLE NEIGHBORS",
+        REACHED_MAXIMUM_SCORE: "TERMINATING - REACHED MAXIMUM SCORE",
+        REACHED_MAXIMUM_STEPS: "TERMINATING - REACHED MAXIMUM STEPS",
+        REACHED_TIME_LIMIT: "TERMINATING - REACHED TIME LIMIT",
+    }
+
+    def __init__(self, interval=100, file=None):
+        """
+        :param interval: number of steps between two printed lines
+        :param file: stream to print to, None for the current sys.stdout
+        """
+        self.interval = interval
+        self.file = file
+
+    def on_step(self, step, current_score, best_score):
+        if step % self.interval == 0:
+            print(
+                "STEP %d - CURRENT SCORE: %d - BEST SCORE: %d"
+                % (step, current_score, best_score),
+                file=self.file,
+            )
+
+    def on_terminate(self, step, best_score, reason):
+        print(self.MESSAGES[reason], file=self.file)
+
+
+class JsonLinesReporter(SearchCallback):
+    """
+    Writes the events as JSON lines: {"event": ..., "step": ..., "time": ...}
+    where time is the number of seconds since the search started
+    """
+
+    def __init__(self, file, interval=1):
+        """
+        :param file: text stream to write to
+        :param interval: number of steps between two step events, improvement
+            and termination events are always written
+        """
+        self.file = file
+        self.interval = interval
+        self.start_time = None
+
+    def _write(self, event, **fields):
+        record = {"event": event, "time": perf_counter() - self.start_time}
+        record.update(fields)
+        # Scores may be numpy scalars
+        self.file.write(json.dumps(record, default=lambda value: value.item()))
+        self.file.write("\n")
+
+    def on_start(self, search):
+        self.start_time = perf_counter()
+        self._write("start", step=0, best_score=search.best_score)
+
+    def on_step(self, step, current_score, best_score):
+        if step % self.interval == 0:
+            self._write(
+                "step", step=step, current_score=current_score, best_score=best_score
+            )
+
+    def on_improvement(self, step, best_score):
+        self._write("improvement", step=step, best_score=best_score)
+
+    def on_terminate(self, step, best_score, reason):
+        self._write("terminate", step=step, best_score=best_score, reason=reason)
+        self.file.flush()
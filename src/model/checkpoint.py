@@ -0,0 +1,70 @@
+import os
+import pickle
+from time import perf_counter
+
+
+class Checkpointer:
+    """
+    Saves the state of a running TabuSearch to a file at most once per interval.
+
+    Each save writes a temporary file next to the checkpoint and renames it
+    over the checkpoint, so the file always holds a complete checkpoint even
+    if the process is killed while writing.
+    """
+
+    def __init__(self, path, interval=60.0):
+        """
+        :param path: checkpoint file
+        :param interval: minimum number of seconds between two saves
+        """
+        self.path = path
+        self.interval = interval
+        # Saved along the search state, e.g. the stage of a chain of searches
+        self.context = {}
+        self.next_save = perf_counter() + interval
+
+    def due(self):
+        """
+        Returns whether the interval since the last save has passed
+        """
+        return perf_counter() >= self.next_save
+
+    def save(self, state):
+        """
+        Atomically writes a checkpoint
+
+        :param state: state of the search (see TabuSearch._checkpoint)
+        :return: None
+        """
+        payload = dict(self.context)
+        payload["search"] = state
+
+        # Overwritten by the next save if the process is killed while writing
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.path)
+
+        self.next_save = perf_counter() + self.interval
+
+    def remove(self):
+        """
+        Deletes the checkpoint once the search it belongs to is over
+
+        :return: None
+        """
+        for path in (self.path, self.path + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def load_checkpoint(path):
+    """
+    Reads a checkpoint written by Checkpointer.save
+
+    :return: saved context with the search state under "search"
+    """
+    with open(path, "rb") as file:
+        return pickle.load(file)
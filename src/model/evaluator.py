@@ -0,0 +1,239 @@
+import numpy as np
+
+from src.model.modeling import PERIODS, SESSION_PERIODS
+
+# Penalty of a single violation, same weight as in ClassCourseTeacherAssignmentProblem.get_score
+PENALTY = 100
+
+
+class DeltaEvaluator:
+    """
+    Keeps class and teacher occupancy counts of the current state so that the
+    score change of moving a single assignment costs O(period length).
+
+    Class and teacher conflicts are counted as doubly-booked periods (one per
+    period in which a class or teacher holds more than one assignment). This
+    count is zero exactly when the problem checkers report no conflict and is
+    never below the number of conflicting assignments they count, so it only
+    ranks the neighbors: TabuSearchAlgorithm keeps and reports its states
+    scored by ClassCourseTeacherAssignmentProblem.get_score.
+    """
+
+    def __init__(self, problem, constraints):
+        """
+        :param problem: a ClassCourseTeacherAssignmentProblem
+        :param constraints: constraints penalized by the score (see TabuSearch)
+        """
+        self.problem = problem
+        self.constraints = constraints
+        self.width = (
+            PERIODS
+            + 2
+            + max([p for p in problem.subject_periods if isinstance(p, int)], default=0)
+        )
+
+        self.class_counts = None
+        self.teacher_counts = None
+        self.score = None
+        # Doubly-booked periods of the scored class and teacher constraints
+        self.conflicts = None
+
+    def reset(self, assignments):
+        """
+        Rebuilds the occupancy counts from a whole state
+
+        :param assignments: a Schedule
+        :return: score of the state
+        """
+        self.classes = assignments.classes.tolist()
+        self.durations = [
+            self.problem.subject_periods[subject]
+            for subject in assignments.subjects.tolist()
+        ]
+        self.starts = assignments.starts.tolist()
+        self.teachers = assignments.teachers.tolist()
+        # Same values as columns for the batch evaluation
+        self.class_column = np.array(self.classes)
+        self.duration_column = np.array(self.durations)
+        self.start_column = np.array(self.starts)
+        self.teacher_column = np.array(self.teachers)
+        self.max_duration = max(self.durations, default=0)
+
+        self.class_counts = np.zeros((self.problem.N + 1, self.width), dtype=int)
+        self.teacher_counts = np.zeros((self.problem.T + 1, self.width), dtype=int)
+
+        self.score = 0
+        self.conflicts = 0
+        for index in range(len(self.starts)):
+            self.score += self._place(index, self.starts[index], self.teachers[index])
+
+        return self.score
+
+    def evaluate(self, assignments):
+        """
+        Scores a whole state from scratch, leaving the current counts untouched
+
+        :param assignments: a Schedule
+        :return: score of the state
+        """
+        evaluator = DeltaEvaluator(self.problem, self.constraints)
+        return evaluator.reset(assignments)
+
+    def delta(self, index, start, teacher):
+        """
+        Returns the score change of moving one assignment, without applying it
+
+        :param index: index of the assignment in the state
+        :param start: new start time
+        :param teacher: new teacher
+        :return: score of the neighbor minus score of the current state
+        """
+        old_start, old_teacher = self.starts[index], self.teachers[index]
+        if start == old_start and teacher == old_teacher:
+            return 0
+
+        delta = self._remove(index) + self._place(index, start, teacher)
+        self._remove(index)
+        self._place(index, old_start, old_teacher)
+
+        return delta
+
+    def deltas(self, indices, starts, teachers):
+        """
+        Returns the score changes of a batch of moves in one vectorized pass,
+        each move being evaluated independently against the current state
+
+        :param indices: array of indices of the moved assignments
+        :param starts: array of new start times
+        :param teachers: array of new teachers
+        :return: array of scores of the neighbors minus score of the current state
+        """
+        indices = np.asarray(indices)
+        starts = np.asarray(starts)[:, None]
+        teachers = np.asarray(teachers)[:, None]
+        old_starts = self.start_column[indices][:, None]
+        old_teachers = self.teacher_column[indices][:, None]
+        classes = self.class_column[indices][:, None]
+        durations = self.duration_column[indices][:, None]
+
+        # One column per period of the longest subject
+        offsets = np.arange(self.max_duration)[None, :]
+        in_duration = offsets < durations
+        old_periods = old_starts + offsets
+        new_periods = starts + offsets
+        # Periods of the new interval freed by removing the assignment itself
+        in_old = (
+            in_duration
+            & (new_periods >= old_starts)
+            & (new_periods < old_starts + durations)
+        )
+
+        violations = self._column_violations(
+            starts, durations
+        ) - self._column_violations(old_starts, durations)
+        if 1 in self.constraints:
+            counts = self.class_counts[classes, old_periods]
+            violations -= np.sum(in_duration & (old_starts != 0) & (counts > 1), axis=1)
+            counts = self.class_counts[classes, new_periods] - (
+                in_old & (old_starts != 0)
+            )
+            violations += np.sum(in_duration & (starts != 0) & (counts > 0), axis=1)
+        if 2 in self.constraints:
+            counts = self.teacher_counts[old_teachers, old_periods]
+            violations -= np.sum(
+                in_duration & (old_teachers != 0) & (counts > 1), axis=1
+            )
+            counts = self.teacher_counts[teachers, new_periods] - (
+                in_old & (old_teachers != 0) & (teachers == old_teachers)
+            )
+            violations += np.sum(in_duration & (teachers != 0) & (counts > 0), axis=1)
+
+        assigned = ((starts != 0) & (teachers != 0)).astype(int) - (
+            (old_starts != 0) & (old_teachers != 0)
+        )
+
+        return assigned[:, 0] - PENALTY * violations
+
+    def apply(self, index, start, teacher):
+        """
+        Moves one assignment and updates the occupancy counts
+
+        :param index: index of the assignment in the state
+        :param start: new start time
+        :param teacher: new teacher
+        :return: new score
+        """
+        self.score += self._remove(index) + self._place(index, start, teacher)
+        return self.score
+
+    def _violations(self, index, start):
+        violations = 0
+        duration = self.durations[index]
+        # Thoi gian bat dau, ket thuc phai cung buoi
+        if 0 in self.constraints and start:
+            session = (start - 1) // SESSION_PERIODS
+            if session != (start + duration - 2) // SESSION_PERIODS:
+                violations += 1
+        # Thoi gian ket thuc khong vuot qua 60 tiet
+        if 3 in self.constraints and start + duration - 1 > PERIODS:
+            violations += 1
+
+        return violations
+
+    def _column_violations(self, starts, durations):
+        """Vectorized _violations over columns of start times and durations"""
+        violations = np.zeros(starts.shape, dtype=int)
+        if 0 in self.constraints:
+            violations += (starts != 0) & (
+                (starts - 1) // SESSION_PERIODS
+                != (starts + durations - 2) // SESSION_PERIODS
+            )
+        if 3 in self.constraints:
+            violations += starts + durations - 1 > PERIODS
+
+        return violations[:, 0]
+
+    def _place(self, index, start, teacher):
+        """Books the assignment at (start, teacher) and returns the score change"""
+        self.starts[index] = start
+        self.teachers[index] = teacher
+        self.start_column[index] = start
+        self.teacher_column[index] = teacher
+        end = start + self.durations[index]
+
+        conflicts = 0
+        if start:
+            periods = self.class_counts[self.classes[index], start:end]
+            if 1 in self.constraints:
+                conflicts += np.count_nonzero(periods)
+            periods += 1
+        if teacher:
+            periods = self.teacher_counts[teacher, start:end]
+            if 2 in self.constraints:
+                conflicts += np.count_nonzero(periods)
+            periods += 1
+        self.conflicts += int(conflicts)
+
+        violations = self._violations(index, start) + conflicts
+        return int(bool(start and teacher)) - PENALTY * int(violations)
+
+    def _remove(self, index):
+        """Frees the booking of the assignment and returns the score change"""
+        start, teacher = self.starts[index], self.teachers[index]
+        end = start + self.durations[index]
+
+        conflicts = 0
+        if start:
+            periods = self.class_counts[self.classes[index], start:end]
+            periods -= 1
+            if 1 in self.constraints:
+                conflicts += np.count_nonzero(periods)
+        if teacher:
+            periods = self.teacher_counts[teacher, start:end]
+            periods -= 1
+            if 2 in self.constraints:
+                conflicts += np.count_nonzero(periods)
+        self.conflicts -= int(conflicts)
+
+        violations = self._violations(index, start) + conflicts
+        return PENALTY * int(violations) - int(bool(start and teacher))
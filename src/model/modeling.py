@@ -1,7 +1,86 @@
+from copy import copy
 from random import choice, randint, random
+from typing import NamedTuple
 
 import numpy as np
 
+# So tiet hoc trong 1 tuan: 10 buoi 6 tiet
+SESSIONS = 10
+SESSION_PERIODS = 6
+PERIODS = SESSIONS * SESSION_PERIODS
+# Bitmask of periods 0-60
+WEEK_MASK = (1 << (PERIODS + 1)) - 1
+
+
+class Move(NamedTuple):
+    """Change of a single assignment: index in the state, new start time, new teacher"""
+
+    index: int
+    start: int
+    teacher: int
+
+
+class Schedule:
+    """
+    State of the problem stored as contiguous columns (Class, Subject, Start time, Teacher).
+
+    The class and subject columns are static and shared by every state of a
+    problem, only the start time and teacher columns are copied.
+    """
+
+    def __init__(self, classes, subjects, starts, teachers):
+        self.classes = classes
+        self.subjects = subjects
+        self.starts = starts
+        self.teachers = teachers
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds a state from rows of (Class, Subject, Start time, Teacher)"""
+        columns = np.array(rows, dtype=np.int16).reshape(-1, 4).T.copy()
+        return cls(*columns)
+
+    def __len__(self):
+        return len(self.classes)
+
+    def __getitem__(self, index):
+        return [
+            int(self.classes[index]),
+            int(self.subjects[index]),
+            int(self.starts[index]),
+            int(self.teachers[index]),
+        ]
+
+    def __iter__(self):
+        return zip(
+            self.classes.tolist(),
+            self.subjects.tolist(),
+            self.starts.tolist(),
+            self.teachers.tolist(),
+        )
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Schedule)
+            and np.array_equal(self.classes, other.classes)
+            and np.array_equal(self.subjects, other.subjects)
+            and np.array_equal(self.starts, other.starts)
+            and np.array_equal(self.teachers, other.teachers)
+        )
+
+    def __str__(self):
+        return str([list(row) for row in self])
+
+    def copy(self):
+        return Schedule(self.classes, self.subjects, self.starts.copy(), self.teachers.copy())
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def assigned(self):
+        """Mask of the class-subjects that have both a start time and a teacher"""
+        return (self.starts != 0) & (self.teachers != 0)
+
 
 class ClassCourseTeacherAssignmentProblem:
     def __init__(self, N, T, class_subjects, subject_periods, subject_teachers, subject_times):
@@ -12,28 +91,131 @@ class ClassCourseTeacherAssignmentProblem:
         self.subject_teachers = subject_teachers
         self.subject_times = subject_times
 
-    def initialize_state(self, prob=0.3):
-        assignments = []
-        for class_n in range(1, self.N + 1):
-            subjects = self.class_subjects[class_n]
-            for subject in subjects:
-                assignments.append([class_n, subject, 0, 0])
-
-                if random() < prob:
-                    self.change_both(assignments[-1])
+        # Static columns shared by every state
+        self.classes = np.array(
+            [class_n for class_n in range(1, N + 1) for _ in class_subjects[class_n]],
+            dtype=np.int16,
+        )
+        self.subjects = np.array(
+            [subject for class_n in range(1, N + 1) for subject in class_subjects[class_n]],
+            dtype=np.int16,
+        )
+
+        # Number of periods of each subject, 0 for the placeholder
+        self.period_lengths = np.array([0] + list(subject_periods[1:]), dtype=np.int64)
+
+        # Bitmask of the periods taken by each (subject, start time), bit i is period i
+        self.interval_masks = [
+            [
+                (((1 << self.subject_periods[subject]) - 1) << start) & WEEK_MASK
+                for start in range(PERIODS + 1)
+            ]
+            if subject
+            else [0] * (PERIODS + 1)
+            for subject in range(len(subject_periods))
+        ]
+
+        # Constraints that hold by construction for every state built by the move operators
+        self.implied_constraints = self.find_implied_constraints()
+
+        # Set by presolve: problem presolved and its state index of each class-subject
+        self.original = None
+        self.pairs = None
+
+    def find_implied_constraints(self):
+        """
+        Returns the constraints no start time of subject_times can violate.
+        States only take their start times from subject_times, so these
+        constraints never need to be checked while searching.
+        """
+        if self.subject_times is None:
+            return set()
+
+        implied = {0, 3}
+        for subject in range(1, len(self.subject_periods)):
+            periods = self.subject_periods[subject]
+            for start_time in self.subject_times[subject]:
+                # Thoi gian bat dau, ket thuc phai cung buoi
+                if (start_time - 1) // SESSION_PERIODS != (start_time + periods - 2) // SESSION_PERIODS:
+                    implied.discard(0)
+                # Thoi gian ket thuc khong vuot qua 60 tiet
+                if start_time + periods - 1 > PERIODS:
+                    implied.discard(3)
+
+        return implied
+
+    def compile_constraints(self, constraints):
+        """
+        Leaves out the constraints implied by the move operators
+
+        :param constraints: constraints to penalize
+        :return: constraints that a search over this problem has to check
+        """
+        return [constraint for constraint in constraints if constraint not in self.implied_constraints]
+
+    def presolve(self):
+        """
+        Removes the class-subjects that can never be assigned: subjects without
+        a teacher, or whose number of periods leaves no valid start time
+
+        :return: problem over the remaining class-subjects, densely indexed
+        """
+        subjects = self.subjects.tolist()
+        assignable = [
+            len(self.subject_teachers[subject]) > 0 and len(self.subject_times[subject]) > 0
+            for subject in subjects
+        ]
+
+        presolved = copy(self)
+        presolved.original = self
+        presolved.pairs = np.flatnonzero(assignable)
+        presolved.classes = self.classes[presolved.pairs]
+        presolved.subjects = self.subjects[presolved.pairs]
+
+        return presolved
+
+    def restore(self, assignments):
+        """
+        Maps a state of a presolved problem back to the class-subjects of the original problem
+
+        :param assignments: a Schedule of this problem
+        :return: a Schedule of the original problem, removed class-subjects are unassigned
+        """
+        if self.original is None:
+            return assignments
+
+        starts = np.zeros(len(self.original.classes), dtype=np.int16)
+        teachers = np.zeros(len(self.original.classes), dtype=np.int16)
+        starts[self.pairs] = assignments.starts
+        teachers[self.pairs] = assignments.teachers
+
+        return Schedule(self.original.classes, self.original.subjects, starts, teachers)
 
-        return assignments
+    def initialize_state(self, prob=0.3):
+        starts = np.zeros(len(self.classes), dtype=np.int16)
+        teachers = np.zeros(len(self.classes), dtype=np.int16)
+        for index, (class_n, subject) in enumerate(
+            zip(self.classes.tolist(), self.subjects.tolist())
+        ):
+            if random() < prob:
+                assignment = [class_n, subject, 0, 0]
+                self.change_both(assignment)
+                starts[index], teachers[index] = assignment[2], assignment[3]
+
+        return Schedule(self.classes, self.subjects, starts, teachers)
     
-    def get_maximum_score(self):
-        result = self.initialize_state(prob = 1.0)
-        score = 0
-        final_result = []
-        for r in result:
-            if r[2] and r[3]:
-                final_result.append(r)
-                score += 1
-                
-        return score
+    def get_maximum_score(self, constraints=(1, 2), flow=False, restricted_starts=True):
+        """
+        Upper bound on the score, see src.model.bounds.upper_bound
+
+        :param constraints: scored constraints
+        :param flow: also solve the class -> class-subject -> teacher flow relaxation
+        :param restricted_starts: states take their start times from subject_times
+        :return: maximum score a state can reach
+        """
+        # Imported here, bounds imports the week constants of this module
+        from src.model.bounds import upper_bound
+        return upper_bound(self, constraints, flow, restricted_starts)
     
     ##################################################################################################
     # Constraint
@@ -42,15 +224,15 @@ class ClassCourseTeacherAssignmentProblem:
     def check_same_session_time(self, assignments):
         time_violation = 0
 
-        for assignment in assignments:
-            if (assignment[2]) == 0:
+        for subject, start_time in zip(
+            assignments.subjects.tolist(), assignments.starts.tolist()
+        ):
+            if start_time == 0:
                 continue
 
             # start_time // 6 - end_time // 6 = 0
-            start_time_session = (assignment[2] - 1) // 6
-            end_time_session = (
-                (assignment[2] + self.subject_periods[assignment[1]]) - 2
-            ) // 6
+            start_time_session = (start_time - 1) // 6
+            end_time_session = ((start_time + self.subject_periods[subject]) - 2) // 6
 
             if start_time_session != end_time_session:
                 # return False
@@ -63,18 +245,20 @@ class ClassCourseTeacherAssignmentProblem:
     def check_teacher_schedule_conflicts(self, assignments):
         time_violation = 0
 
-        # Mang luu trang thai cua cac giao vien tu tiet 1-60
-        teacher_periods = np.zeros((self.T + 1, 61), dtype=int)
+        # Lich cua cac giao vien tu tiet 1-60, moi giao vien la 1 bitmask
+        teacher_periods = [0] * (self.T + 1)
 
-        for assignment in assignments:
-            if assignment[3] == 0:
+        for subject, start_time, teacher in zip(
+            assignments.subjects.tolist(),
+            assignments.starts.tolist(),
+            assignments.teachers.tolist(),
+        ):
+            if teacher == 0:
                 continue
 
-            start_time = assignment[2]
-            end_time = (assignment[2] + self.subject_periods[assignment[1]]) - 1
-            teacher = assignment[3]
-            if np.all(teacher_periods[teacher, start_time : end_time + 1] == 0):
-                teacher_periods[teacher, start_time : end_time + 1] = 1
+            periods = self.interval_masks[subject][start_time]
+            if not teacher_periods[teacher] & periods:
+                teacher_periods[teacher] |= periods
             else:
                 # return False
                 time_violation += 1
@@ -86,18 +270,20 @@ class ClassCourseTeacherAssignmentProblem:
     def check_class_schedule_conflicts(self, assignments):
         time_violation = 0
 
-        # Mang luu trang thai cua cac lop tu tiet 1-60
-        classtable = np.zeros((self.N + 1, 61), dtype=int)
+        # Lich cua cac lop tu tiet 1-60, moi lop la 1 bitmask
+        classtable = [0] * (self.N + 1)
 
-        for assignment in assignments:
-            if assignment[2] == 0:
+        for class_n, subject, start_time in zip(
+            assignments.classes.tolist(),
+            assignments.subjects.tolist(),
+            assignments.starts.tolist(),
+        ):
+            if start_time == 0:
                 continue
 
-            class_n = assignment[0]
-            start_time = assignment[2]
-            end_time = (assignment[2] + self.subject_periods[assignment[1]]) - 1
-            if np.all(classtable[class_n, start_time : end_time + 1] == 0):
-                classtable[class_n, start_time : end_time + 1] = 1
+            periods = self.interval_masks[subject][start_time]
+            if not classtable[class_n] & periods:
+                classtable[class_n] |= periods
             else:
                 # return False
                 time_violation += 1
@@ -109,10 +295,12 @@ class ClassCourseTeacherAssignmentProblem:
     def check_end_time_limit(self, assignments):
         time_violation = 0
 
-        for assignment in assignments:
+        for subject, start_time in zip(
+            assignments.subjects.tolist(), assignments.starts.tolist()
+        ):
             # start_time // 6 - end_time // 6 = 0
             # start_time_session = assignment[2]
-            end_time_session = (assignment[2] + self.subject_periods[assignment[1]]) - 1
+            end_time_session = (start_time + self.subject_periods[subject]) - 1
 
             if end_time_session > 60:
                 # return False
@@ -150,34 +338,97 @@ class ClassCourseTeacherAssignmentProblem:
         if self.change_teacher(assignment) is not None:
             return
         self.change_time(assignment)
+
+    def apply_move(self, assignments, move):
+        """Applies a move to a state in place and returns the move that undoes it"""
+        undo = Move(
+            move.index,
+            int(assignments.starts[move.index]),
+            int(assignments.teachers[move.index]),
+        )
+        assignments.starts[move.index] = move.start
+        assignments.teachers[move.index] = move.teacher
+
+        return undo
         
-    def get_score(self, assignments, constraints):
-        score = 0
-        # Penalty
+    def find_overlaps(self, assignments, rows, groups):
+        """
+        Finds the assignments that a check_*_schedule_conflicts loop over the
+        given rows counts as conflicts, i.e. that overlap an earlier
+        non-conflicting assignment of the same class or teacher.
+
+        The periods of every row are expanded and counted per (group, period)
+        with bincount. Rows whose periods are all counted once overlap nothing,
+        only the others are replayed in order with the bitmasks.
+
+        :param rows: mask of the assignments to check
+        :param groups: class or teacher of each assignment
+        :return: indices of the conflicting assignments
+        """
+        rows = np.flatnonzero(rows)
+        starts = assignments.starts[rows].astype(np.int64)
+        periods = self.period_lengths[assignments.subjects[rows]]
+        groups = groups[rows].astype(np.int64)
+
+        # Periods start..end of each row, clipped to the week like interval_masks
+        lengths = np.clip(np.minimum(starts + periods - 1, PERIODS) - starts + 1, 0, None)
+        owners = np.repeat(np.arange(len(rows)), lengths)
+        offsets = np.arange(len(owners)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        keys = groups[owners] * (PERIODS + 1) + starts[owners] + offsets
+
+        counts = np.bincount(keys)
+        crowded = np.bincount(owners[counts[keys] > 1], minlength=len(rows)) > 0
+
+        # Lich cua cac lop / giao vien, chi cac hang co tiet bi trung
+        schedules = {}
+        conflicts = []
+        subjects, starts = assignments.subjects.tolist(), assignments.starts.tolist()
+        for index, group in zip(rows[crowded].tolist(), groups[crowded].tolist()):
+            periods = self.interval_masks[subjects[index]][starts[index]]
+            if not schedules.get(group, 0) & periods:
+                schedules[group] = schedules.get(group, 0) | periods
+            else:
+                conflicts.append(index)
+
+        return np.array(conflicts, dtype=np.int64)
+
+    def find_violations(self, assignments, constraints):
+        """
+        Finds the assignments that violate each constraint in a few array passes
+
+        :param assignments: a Schedule
+        :param constraints: constraints to check
+        :return: dict of each constraint to the indices of its violating assignments,
+            as many as the corresponding check_* method counts
+        """
+        starts = assignments.starts.astype(np.int64)
+        ends = starts + self.period_lengths[assignments.subjects] - 1
+
+        violations = {}
+        # Thời gian bắt đầu, kết thúc phải cùng buổi
         if 0 in constraints:
-            session_violations = self.check_same_session_time(assignments)
-        else :
-            session_violations = 0
-            
+            violations[0] = np.flatnonzero((starts != 0) & ((starts - 1) // SESSION_PERIODS != (ends - 1) // SESSION_PERIODS))
+        # Các môn của cùng lớp không trùng lịch
         if 1 in constraints:
-            class_violations = self.check_class_schedule_conflicts(assignments)
-        else:
-            class_violations = 0
-            
+            violations[1] = self.find_overlaps(assignments, starts != 0, assignments.classes)
+        # Các lớp-môn mà cùng giáo viên dạy không trùng lịch
         if 2 in constraints:
-            teacher_violations = self.check_teacher_schedule_conflicts(assignments)
-        else:
-            teacher_violations = 0
-        
+            violations[2] = self.find_overlaps(assignments, assignments.teachers != 0, assignments.teachers)
+        # Thời gian kết thúc không vượt quá 60 tiết
         if 3 in constraints:
-                endtimelimit_violations = self.check_end_time_limit(assignments)
-        else: 
-            endtimelimit_violations = 0
-        
-        score -= 100 * (session_violations + class_violations + teacher_violations + endtimelimit_violations)
-            
-        for assignment in assignments:
-            if assignment[2] and assignment[3]:
-                score += 1
-                
+            violations[3] = np.flatnonzero(ends > PERIODS)
+
+        return violations
+
+    def get_score(self, assignments, constraints, violations=None):
+        """
+        :param violations: violations of the assignments already found by find_violations
+        """
+        # Penalty
+        if violations is None:
+            violations = self.find_violations(assignments, constraints)
+        score = -100 * sum(len(indices) for indices in violations.values())
+
+        score += int(np.count_nonzero(assignments.assigned()))
+
         return score
\ No newline at end of file
@@ -0,0 +1,84 @@
+from time import perf_counter
+
+from src.utils import format_table
+
+
+class SearchStats:
+    """
+    Cumulative wall time and call counts of the phases of TabuSearch.run
+    """
+
+    PHASES = (
+        "neighborhood",
+        "scoring",
+        "tabu_checks",
+        "aspiration_retries",
+        "best_copies",
+    )
+
+    def __init__(self):
+        self.time = dict.fromkeys(self.PHASES, 0.0)
+        self.calls = dict.fromkeys(self.PHASES, 0)
+
+    def clock(self):
+        """
+        Returns the start time of a phase
+        """
+        return perf_counter()
+
+    def add(self, phase, started=None, calls=1):
+        """
+        Records calls of a phase
+
+        :param phase: name of the phase
+        :param started: start time returned by clock(), None to only count calls
+        :param calls: number of calls to count
+        :return: current time, to be used as start time of the next phase
+        """
+        self.calls[phase] += calls
+        if started is None:
+            return None
+
+        now = perf_counter()
+        self.time[phase] += now - started
+        return now
+
+    def merge(self, other):
+        """
+        Adds the records of another SearchStats
+
+        :param other: a SearchStats
+        :return: self
+        """
+        for phase in other.PHASES:
+            self.time[phase] += other.time[phase]
+            self.calls[phase] += other.calls[phase]
+        return self
+
+    def as_dict(self):
+        return {
+            phase: {"time": self.time[phase], "calls": self.calls[phase]}
+            for phase in self.PHASES
+        }
+
+    def __str__(self):
+        rows = [
+            (phase, f"{self.time[phase]:.4f}", str(self.calls[phase]))
+            for phase in self.PHASES
+        ]
+        return format_table(("PHASE", "TIME (s)", "CALLS"), rows)
+
+
+class NullStats:
+    """
+    Stand-in for SearchStats when statistics are disabled, records nothing
+    """
+
+    def clock(self):
+        return None
+
+    def add(self, phase, started=None, calls=1):
+        return None
+
+
+NULL_STATS = NullStats()
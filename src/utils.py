@@ -0,0 +1,14 @@
+def format_table(header, rows):
+    """
+    Formats rows of strings as left-aligned columns separated by two spaces
+
+    :param header: name of each column
+    :param rows: rows of strings, one value per column
+    :return: the header and the rows, one line each
+    """
+    rows = [tuple(header)] + [tuple(row) for row in rows]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
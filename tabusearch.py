@@ -1,61 +1,133 @@
 import argparse
+import cProfile
 import glob
+import io
+import json
+import multiprocessing
 import os
+import random
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
 
+import numpy as np
+
+from src.instance import read_input_file
 from src.model.algorithm import TabuSearchAlgorithm
+from src.model.callbacks import JsonLinesReporter
+from src.model.checkpoint import Checkpointer, load_checkpoint
+from src.model.Greedy import GreedyConstructor, RandomizedGreedyConstructor
 from src.model.modeling import ClassCourseTeacherAssignmentProblem
+from src.model.profiling import SearchStats
+from src.utils import format_table
 
 
-def print_final_result(result):
-    score = 0
-    final_result = []
-    for r in result:
-        if r[2] and r[3]:
-            final_result.append(r)
-            score += 1
+def format_final_result(result):
+    final_result = np.stack(
+        [result.classes, result.subjects, result.starts, result.teachers], axis=1
+    )[result.assigned()]
 
-    print(score)
-    for r in final_result:
-        print(r[0], r[1], r[2], r[3])
+    lines = [str(len(final_result))]
+    lines.extend(f"{r[0]} {r[1]} {r[2]} {r[3]}" for r in final_result.tolist())
+    return "\n".join(lines) + "\n"
 
 
-def write_final_result(result, filename):
-    score = 0
-    final_result = []
-    for r in result:
-        if r[2] and r[3]:
-            final_result.append(r)
-            score += 1
+def print_final_result(result):
+    print(format_final_result(result), end="")
 
+
+def write_final_result(result, filename):
     with open(filename, "w") as f:
-        f.writelines(str(score) + "\n")
-        for r in final_result:
-            f.writelines(f"{r[0]} {r[1]} {r[2]} {r[3]}\n")
+        f.write(format_final_result(result))
 
 
-def run(opt, N, T, class_subjects, subject_periods, subject_teachers, subject_times):
-    # Initialize problem modeling
-    problem = ClassCourseTeacherAssignmentProblem(
-        N, T, class_subjects, subject_periods, subject_teachers, subject_times
-    )
-    # Initialize algorithm
-    if opt.early_stopping:
-        max_score = problem.get_maximum_score()
-        print("MAX_SCORE: ", max_score)
-    else:
-        max_score = None
+def _remaining_time(deadline):
+    """Seconds left before a time.perf_counter() deadline, None without deadline"""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.perf_counter())
+
+
+def initial_state(opt, problem, deadline=None):
+    """
+    Builds the state the search starts from, as chosen by opt.init
+
+    :param deadline: time.time() after which the GRASP polish runs stop, None without deadline
+    """
+    if opt.init == "greedy":
+        return GreedyConstructor(problem).assign_classtable()
+    if opt.init == "grasp":
+        return grasp(opt, problem, deadline)[0]
+    return problem.initialize_state()
+
+
+def _grasp_worker(opt, problem, seed, deadline=None):
+    """Builds one randomized greedy state and polishes it with a short tabu search"""
+    random.seed(seed)
+    state = RandomizedGreedyConstructor(problem, opt.grasp_alpha).assign_classtable()
+    if not opt.grasp_polish:
+        return state, problem.get_score(state, opt.constraints)
+
     algorithm = TabuSearchAlgorithm(
         problem,
-        problem.initialize_state(),
+        state,
         opt.tabu_tenure,
-        opt.max_steps,
+        opt.grasp_polish,
         opt.neighborhood_size,
         constraints=opt.constraints,
-        print_interval=opt.interval,
-        max_score=max_score,
+        tabu_attribute=opt.tabu_attribute,
+        full_validation=opt.full_validation,
+        # Wall-clock deadline, the workers of a pool do not share perf_counter
+        time_limit=None if deadline is None else max(0.0, deadline - time.time()),
     )
-    result, score = algorithm.run(verbose=opt.verbose)
+    return algorithm.run(verbose=False)
+
+
+def _grasp_workers(opt):
+    """Processes building the GRASP constructions, one inside a pool of searches or instances"""
+    if opt.grasp_workers is not None:
+        return opt.grasp_workers
+    if opt.workers > 1 or opt.jobs > 1:
+        return 1
+    return os.cpu_count()
+
+
+def grasp(opt, problem, deadline=None):
+    """
+    Builds opt.grasp_starts randomized greedy states, in a process pool when
+    more than one GRASP worker is used, and keeps the best one
+
+    :param deadline: time.time() after which the polish runs stop, None without deadline
+    :return: best state and its score
+    """
+    # Drawn from the seeded generator so that the construction is reproducible
+    seeds = [random.randrange(2**32) for _ in range(opt.grasp_starts)]
+    workers = _grasp_workers(opt)
+    if workers == 1:
+        # The builds seed the generator, give it back as a pool would leave it
+        random_state = random.getstate()
+        results = [_grasp_worker(opt, problem, seed, deadline) for seed in seeds]
+        random.setstate(random_state)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    _grasp_worker,
+                    [opt] * opt.grasp_starts,
+                    [problem] * opt.grasp_starts,
+                    seeds,
+                    [deadline] * opt.grasp_starts,
+                    chunksize=max(1, opt.grasp_starts // (4 * workers)),
+                )
+            )
+
+    # First best in seed order
+    return max(results, key=lambda result: result[1])
+
+
+def _stages(opt):
+    """Tabu tenure and maximum steps of each search of the dynamic tenure chain"""
+    stages = [(opt.tabu_tenure, opt.max_steps)]
     if opt.dynamic_tenure:
         tabu_tenure = opt.tabu_tenure
         max_steps = opt.max_steps
@@ -63,19 +135,371 @@ def run(opt, N, T, class_subjects, subject_periods, subject_teachers, subject_ti
             tabu_tenure *= 10
             max_steps *= 0.7
             max_steps = int(max_steps)
-            algorithm = TabuSearchAlgorithm(
-                problem,
-                result,
-                tabu_tenure,
-                max_steps,
-                opt.neighborhood_size,
-                constraints=opt.constraints,
-                print_interval=opt.interval,
-                max_score=None,
+            stages.append((tabu_tenure, max_steps))
+    return stages
+
+
+def _checkpoint_parameters(opt, seed, max_score):
+    """Parameters a checkpoint can only be resumed with"""
+    return {
+        "seed": seed,
+        "max_score": max_score,
+        "stages": _stages(opt),
+        "neighborhood_size": opt.neighborhood_size,
+        "constraints": opt.constraints,
+        "tabu_attribute": opt.tabu_attribute,
+        "presolve": not opt.no_presolve,
+        "full_validation": opt.full_validation,
+    }
+
+
+def search(
+    opt,
+    problem,
+    seed=None,
+    max_score=None,
+    stop_event=None,
+    profile_path=None,
+    progress_path=None,
+    checkpoint_path=None,
+):
+    """
+    Runs one tabu search (and its dynamic tenure loop) from a random initial state
+
+    :param seed: seed of the random generator, None to keep the current state
+    :param stop_event: event that stops the search once set; set when max_score is reached
+    :param profile_path: file the cProfile stats are dumped to, None to not profile
+    :param progress_path: JSON-lines file the search events are written to, None to not write them
+    :param checkpoint_path: file the search state is periodically saved to (and resumed
+        from with opt.resume), None to not checkpoint
+    :return: best state, its score, the number of steps run and the SearchStats
+        of the run (None without opt.stats)
+    """
+    # The whole dynamic tenure chain shares one time budget
+    deadline = (
+        time.perf_counter() + opt.time_limit if opt.time_limit is not None else None
+    )
+    profiler = cProfile.Profile() if profile_path is not None else None
+    if profiler is not None:
+        profiler.enable()
+    stats = SearchStats() if opt.stats else None
+    callbacks = []
+    if progress_path is not None:
+        progress = open(progress_path, "w")
+        callbacks.append(JsonLinesReporter(progress, opt.interval))
+
+    checkpointer = None
+    checkpoint = None
+    if checkpoint_path is not None:
+        parameters = _checkpoint_parameters(opt, seed, max_score)
+        checkpointer = Checkpointer(checkpoint_path, opt.checkpoint_interval)
+        if opt.resume and os.path.exists(checkpoint_path):
+            checkpoint = load_checkpoint(checkpoint_path)
+            if checkpoint["parameters"] != parameters:
+                raise ValueError(
+                    f"{checkpoint_path} was saved by a search with other parameters"
+                )
+
+    if checkpoint is not None:
+        first_stage = checkpoint["stage"]
+        steps = checkpoint["steps"]
+        # Replaced by the saved state of the run
+        result = checkpoint["search"]["current"]
+    else:
+        first_stage = 0
+        steps = 0
+        if seed is not None:
+            random.seed(seed)
+        result = initial_state(
+            opt,
+            problem,
+            None if deadline is None else time.time() + _remaining_time(deadline),
+        )
+
+    for stage, (tabu_tenure, max_steps) in enumerate(_stages(opt)):
+        if stage < first_stage:
+            continue
+        # The stage of a checkpoint always runs, to return its saved best state
+        if (
+            stage > first_stage
+            and deadline is not None
+            and time.perf_counter() >= deadline
+        ):
+            break
+
+        algorithm = TabuSearchAlgorithm(
+            problem,
+            result,
+            tabu_tenure,
+            max_steps,
+            opt.neighborhood_size,
+            constraints=opt.constraints,
+            print_interval=opt.interval,
+            max_score=max_score if stage == 0 else None,
+            tabu_attribute=opt.tabu_attribute,
+            full_validation=opt.full_validation,
+            stop_event=stop_event,
+            collect_stats=opt.stats,
+            callbacks=callbacks,
+            time_limit=_remaining_time(deadline),
+            checkpointer=checkpointer,
+        )
+        if checkpointer is not None:
+            checkpointer.context = {
+                "parameters": parameters,
+                "stage": stage,
+                "steps": steps,
+            }
+        result, score = algorithm.run(
+            verbose=opt.verbose,
+            resume=(
+                checkpoint["search"]
+                if checkpoint is not None and stage == first_stage
+                else None
+            ),
+        )
+        steps += algorithm.cur_steps
+        if stats is not None:
+            stats.merge(algorithm.stats)
+        if stage == 0 and stop_event is not None and max_score is not None:
+            if score >= max_score:
+                stop_event.set()
+
+    if checkpointer is not None:
+        checkpointer.remove()
+    if progress_path is not None:
+        progress.close()
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+
+    return result, score, steps, stats
+
+
+def _init_worker(stop_event):
+    global worker_stop_event
+    worker_stop_event = stop_event
+
+
+def _seed_path(path, seed):
+    """Path of the output file of the worker searching with `seed`"""
+    if path is None:
+        return None
+    root, ext = os.path.splitext(path)
+    return f"{root}.{seed}{ext}"
+
+
+def _search_worker(
+    opt, problem, seed, max_score, profile_path, progress_path, checkpoint_path
+):
+    # Pool children print to their own stdout, the parent prints their output instead
+    log = io.StringIO()
+    with redirect_stdout(log):
+        # One output file per worker
+        result = search(
+            opt,
+            problem,
+            seed,
+            max_score,
+            worker_stop_event,
+            _seed_path(profile_path, seed),
+            _seed_path(progress_path, seed),
+            _seed_path(checkpoint_path, seed),
+        )
+    return result + (log.getvalue(),)
+
+
+def parallel_search(
+    opt,
+    problem,
+    max_score=None,
+    profile_path=None,
+    progress_path=None,
+    checkpoint_path=None,
+):
+    """
+    Runs independent searches with distinct seeds in a process pool
+
+    :return: best state over all searches, its score, the steps of its search
+        and the SearchStats of all searches merged (None without opt.stats)
+    """
+    # Without --seed the seeds are saved so that --resume continues the same searches
+    checkpointer = None
+    if checkpoint_path is not None and opt.seed is None:
+        checkpointer = Checkpointer(checkpoint_path)
+        if opt.resume and os.path.exists(checkpoint_path):
+            base_seed = load_checkpoint(checkpoint_path)["base_seed"]
+        else:
+            base_seed = random.randrange(2**32)
+            checkpointer.context = {"base_seed": base_seed}
+            checkpointer.save(None)
+    else:
+        base_seed = opt.seed if opt.seed is not None else random.randrange(2**32)
+    seeds = [base_seed + worker for worker in range(opt.workers)]
+
+    stop_event = multiprocessing.Event()
+    with ProcessPoolExecutor(
+        max_workers=opt.workers, initializer=_init_worker, initargs=(stop_event,)
+    ) as executor:
+        results = list(
+            executor.map(
+                _search_worker,
+                [opt] * opt.workers,
+                [problem] * opt.workers,
+                seeds,
+                [max_score] * opt.workers,
+                [profile_path] * opt.workers,
+                [progress_path] * opt.workers,
+                [checkpoint_path] * opt.workers,
             )
-            result, score = algorithm.run(verbose=opt.verbose)
+        )
+    if checkpointer is not None:
+        checkpointer.remove()
+
+    # Output of each worker as a whole, in seed order
+    for seed, (*_, log) in zip(seeds, results):
+        if log:
+            print(f"SEED: {seed}")
+            print(log, end="", flush=True)
+    results = [result[:-1] for result in results]
+
+    stats = None
+    if opt.stats:
+        stats = SearchStats()
+        for result in results:
+            stats.merge(result[3])
+
+    # First best in seed order
+    result, score, steps, _ = max(results, key=lambda result: result[1])
+    return result, score, steps, stats
+
+
+def run(
+    opt,
+    N,
+    T,
+    class_subjects,
+    subject_periods,
+    subject_teachers,
+    subject_times,
+    profile_path=None,
+    progress_path=None,
+    checkpoint_path=None,
+):
+    # Initialize problem modeling
+    problem = ClassCourseTeacherAssignmentProblem(
+        N, T, class_subjects, subject_periods, subject_teachers, subject_times
+    )
+    if not opt.no_presolve:
+        problem = problem.presolve()
+    # Initialize algorithm
+    if opt.early_stopping:
+        max_score = problem.get_maximum_score(opt.constraints, opt.flow_bound)
+        print("MAX_SCORE: ", max_score)
+    else:
+        max_score = None
 
-    return result, score
+    if len(problem.classes) == 0:
+        # No class-subject can be assigned, nothing to search
+        result, score, steps, stats = problem.initialize_state(), 0, 0, None
+    elif opt.workers > 1:
+        result, score, steps, stats = parallel_search(
+            opt, problem, max_score, profile_path, progress_path, checkpoint_path
+        )
+    else:
+        result, score, steps, stats = search(
+            opt,
+            problem,
+            opt.seed,
+            max_score,
+            profile_path=profile_path,
+            progress_path=progress_path,
+            checkpoint_path=checkpoint_path,
+        )
+
+    # One table per instance, over every worker
+    if stats is not None:
+        print(stats)
+
+    # Back to the class-subjects of the input
+    return problem.restore(result), score, max_score, steps
+
+
+def solve_file(opt, file_path):
+    """
+    Solves one input file and writes pred.txt next to it
+
+    :return: printed progress of the instance and its summary row
+    """
+    log = io.StringIO()
+    with redirect_stdout(log):
+        # Read_from_file
+        print(file_path)
+
+        N, T, class_subjects, subject_periods, subject_teachers, subject_times = (
+            read_input_file(file_path)
+        )
+
+        start_time = time.time()
+        result, score, max_score, steps = run(
+            opt,
+            N,
+            T,
+            class_subjects,
+            subject_periods,
+            subject_teachers,
+            subject_times,
+            profile_path=(
+                os.path.join(os.path.dirname(file_path), "profile.pstats")
+                if opt.profile
+                else None
+            ),
+            progress_path=(
+                os.path.join(os.path.dirname(file_path), "progress.jsonl")
+                if opt.progress
+                else None
+            ),
+            checkpoint_path=(
+                os.path.join(os.path.dirname(file_path), "checkpoint.pkl")
+                if opt.checkpoint
+                else None
+            ),
+        )
+        run_time = time.time() - start_time
+
+        # print_final_result(result)
+        filename = os.path.join(os.path.dirname(file_path), "pred.txt")
+        write_final_result(result, filename)
+
+        if opt.score:
+            print(f"SCORE: {score}")
+
+        if opt.time:
+            print(f"Total run time: {run_time}s")
+
+    summary = {
+        "instance": file_path,
+        "max_score": max_score,
+        "score": int(score),
+        "time": run_time,
+        "steps": steps,
+    }
+    return log.getvalue(), summary
+
+
+def print_summary(summaries):
+    header = ("INSTANCE", "MAX_SCORE", "SCORE", "TIME (s)", "STEPS")
+    rows = [
+        (
+            summary["instance"],
+            "-" if summary["max_score"] is None else str(summary["max_score"]),
+            str(summary["score"]),
+            f"{summary['time']:.2f}",
+            str(summary["steps"]),
+        )
+        for summary in summaries
+    ]
+    print(format_table(header, rows))
 
 
 if __name__ == "__main__":
@@ -107,11 +531,70 @@ if __name__ == "__main__":
         help="input is obtained from the file",
     )
     parser.add_argument("--verbose", action="store_true", help="print progress")
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="write the search events of each instance as JSON lines next to its input",
+    )
     parser.add_argument(
         "--early_stopping",
         action="store_true",
         help="early stop when reached maximum score",
     )
+    parser.add_argument(
+        "--init",
+        type=str,
+        default="random",
+        choices=["random", "greedy", "grasp"],
+        help="initial state: random assignment of 30%% of the class-subjects, greedy construction or best of --grasp_starts randomized greedy constructions",
+    )
+    parser.add_argument(
+        "--grasp_starts",
+        type=int,
+        default=32,
+        help="number of randomized greedy constructions of --init grasp",
+    )
+    parser.add_argument(
+        "--grasp_alpha",
+        type=float,
+        default=0.3,
+        help="restricted candidate list width of --init grasp: 0 only draws greedy ties, 1 draws among all candidates",
+    )
+    parser.add_argument(
+        "--grasp_polish",
+        type=int,
+        default=0,
+        help="tabu search steps run on each construction of --init grasp, 0 to keep the constructions as built",
+    )
+    parser.add_argument(
+        "--grasp_workers",
+        type=int,
+        default=None,
+        help="number of processes building the constructions of --init grasp "
+        "(default: 1 with --workers or --jobs > 1, else the number of CPUs)",
+    )
+    parser.add_argument(
+        "--time_limit",
+        type=float,
+        default=None,
+        help="seconds after which the search of an instance returns its best result so far",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="periodically save the search state of each instance next to its input (one file per worker)",
+    )
+    parser.add_argument(
+        "--checkpoint_interval",
+        type=float,
+        default=60,
+        help="minimum number of seconds between two checkpoint saves",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the searches from their checkpoint if one exists (the time limit starts over)",
+    )
     parser.add_argument(
         "--interval", type=int, default=100, help="set interval of printing results"
     )
@@ -126,138 +609,98 @@ if __name__ == "__main__":
         default=10,
         help="set loop when using dynamic strategy",
     )
+    parser.add_argument(
+        "--flow_bound",
+        action="store_true",
+        help="bound the maximum score by the class -> class-subject -> teacher flow",
+    )
+    parser.add_argument(
+        "--no_presolve",
+        action="store_true",
+        help="keep the class-subjects that can never be assigned in the search state",
+    )
+    parser.add_argument(
+        "--full_validation",
+        action="store_true",
+        help="also score the constraints that the move operators cannot violate",
+    )
+    parser.add_argument(
+        "--tabu_attribute",
+        type=str,
+        default="index",
+        choices=["index", "move"],
+        help="attribute made tabu: index of the changed class-subject or the whole move",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of independent searches run in parallel, the best result is kept",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="random seed (worker i uses seed + i)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of instances solved in parallel with --file_path all",
+    )
+    parser.add_argument(
+        "--summary_path",
+        type=str,
+        default="summary.json",
+        help="JSON summary written with --file_path all",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="print time and calls of each phase of the search, summed over the workers",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="dump cProfile stats of each instance next to its input (one file per worker)",
+    )
     parser.add_argument("--score", action="store_true", help="print score")
     parser.add_argument("--time", action="store_true", help="print total running time")
 
     opt = parser.parse_args()
 
     if opt.file_path == "all":
-        for file_path in glob.glob("test/test*/input.txt"):
-            # Read_from_file
-            # file_path = opt.file_path
-            print(file_path)
-
-            # Đọc dữ liệu từ file txt
-            with open(file_path, "r") as file:
-                lines = file.readlines()
-
-            # Chuyển đổi dữ liệu đọc được thành các giá trị số
-            T, N, M = map(int, lines[0].split())
-            class_subjects = []
-            class_subjects.append([])
-            for i in range(1, N + 1):
-                subjects = list(map(int, lines[i].split()))
-                class_subjects.append(subjects[:-1])
-
-            teacher_subjects = []
-            teacher_subjects.append([])
-            for i in range(N + 1, N + T + 1):
-                subjects = list(map(int, lines[i].split()))
-                teacher_subjects.append(subjects[:-1])
-
-            subject_periods = list(map(int, lines[N + T + 1].split()))
-            subject_periods.insert(0, [])
-
-            # Make subject teachers list
-            subject_teachers = [[] for i in range(M + 1)]
-            for teacher, subjects in enumerate(teacher_subjects):
-                for subject in subjects:
-                    subject_teachers[subject].append(teacher)
-
-            # Make choiceable time for each subject
-            subject_times = [[i for i in range(1, 61)] for i in range(M + 1)]
-            six_multiples = [s * 6 for s in range(1, 11)]
-            for subject, subject_period in enumerate(subject_periods):
-                if subject == 0:
-                    continue
-                for s in six_multiples:
-                    for i in range(subject_periods[subject] - 1):
-                        subject_times[subject].remove(s - i)
-
-            start_time = time.time()
-            result, score = run(
-                opt,
-                N,
-                T,
-                class_subjects,
-                subject_periods,
-                subject_teachers,
-                subject_times,
-            )
-
-            # print_final_result(result)
-            filename = os.path.join(os.path.dirname(file_path), "pred.txt")
-            write_final_result(result, filename)
-
-            if opt.score:
-                print(f"SCORE: {score}")
-
-            if opt.time:
-                print(f"Total run time: {time.time() - start_time}s")
+        file_paths = sorted(glob.glob("test/test*/input.txt"))
+        summaries = []
+        if opt.jobs > 1:
+            with ProcessPoolExecutor(max_workers=opt.jobs) as executor:
+                futures = [
+                    executor.submit(solve_file, opt, file_path)
+                    for file_path in file_paths
+                ]
+                # Print each instance as a whole once it is solved
+                for future in as_completed(futures):
+                    log, summary = future.result()
+                    print(log, end="", flush=True)
+                    summaries.append(summary)
+        else:
+            for file_path in file_paths:
+                log, summary = solve_file(opt, file_path)
+                print(log, end="", flush=True)
+                summaries.append(summary)
+
+        summaries.sort(key=lambda summary: summary["instance"])
+        print_summary(summaries)
+        with open(opt.summary_path, "w") as f:
+            json.dump(summaries, f, indent=2)
 
         exit()
 
     # Input
-    if opt.keyboard:
-        # Read from keyboard
-        T, N, M = map(int, input().split())
-
-        class_subjects = []
-        class_subjects.append([])
-        for _ in range(N):
-            subjects = list(map(int, input().split()))
-            class_subjects.append(subjects[:-1])
-
-        teacher_subjects = []
-        teacher_subjects.append([])
-        for _ in range(T):
-            subjects = list(map(int, input().split()))
-            teacher_subjects.append(subjects[:-1])
-        subject_periods = list(map(int, input().split()))
-        subject_periods.insert(0, [])
-    else:
-        # Read_from_file
-        file_path = opt.file_path
-
-        # Đọc dữ liệu từ file txt
-        with open(file_path, "r") as file:
-            lines = file.readlines()
-
-        # Chuyển đổi dữ liệu đọc được thành các giá trị số
-        T, N, M = map(int, lines[0].split())
-        class_subjects = []
-        class_subjects.append([])
-        for i in range(1, N + 1):
-            subjects = list(map(int, lines[i].split()))
-            class_subjects.append(subjects[:-1])
-
-        teacher_subjects = []
-        teacher_subjects.append([])
-        for i in range(N + 1, N + T + 1):
-            subjects = list(map(int, lines[i].split()))
-            teacher_subjects.append(subjects[:-1])
-
-        subject_periods = list(map(int, lines[N + T + 1].split()))
-        subject_periods.insert(0, [])
-
-    # Make subject teachers list
-    subject_teachers = [[] for i in range(M + 1)]
-    for teacher, subjects in enumerate(teacher_subjects):
-        for subject in subjects:
-            subject_teachers[subject].append(teacher)
-
-    # Make choiceable time for each subject
-    subject_times = [[i for i in range(1, 61)] for i in range(M + 1)]
-    six_multiples = [s * 6 for s in range(1, 11)]
-    for subject, subject_period in enumerate(subject_periods):
-        if subject == 0:
-            continue
-        for s in six_multiples:
-            for i in range(subject_periods[subject] - 1):
-                subject_times[subject].remove(s - i)
+    N, T, class_subjects, subject_periods, subject_teachers, subject_times = (
+        read_input_file(None if opt.keyboard else opt.file_path)
+    )
 
     start_time = time.time()
-    result, score = run(
+    result, score, _, _ = run(
         opt,
         N,
         T,
@@ -265,6 +708,24 @@ if __name__ == "__main__":
         subject_periods,
         subject_teachers,
         subject_times,
+        profile_path=(
+            ("profile" if opt.keyboard else os.path.splitext(opt.file_path)[0])
+            + ".pstats"
+            if opt.profile
+            else None
+        ),
+        progress_path=(
+            ("progress" if opt.keyboard else os.path.splitext(opt.file_path)[0])
+            + ".jsonl"
+            if opt.progress
+            else None
+        ),
+        checkpoint_path=(
+            ("checkpoint" if opt.keyboard else os.path.splitext(opt.file_path)[0])
+            + ".pkl"
+            if opt.checkpoint
+            else None
+        ),
     )
     print_final_result(result)
 
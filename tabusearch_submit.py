@@ -2,6 +2,7 @@ import argparse
 import logging
 import math
 import os
+import sys
 import time
 from copy import deepcopy
 from random import choice, randint, random
@@ -406,23 +407,19 @@ if __name__ == "__main__":
     
     opt = parser.parse_args()
     
-    # Read from keyboard
-    T, N, M = map(int, input().split())
+    # Read from keyboard: one bulk read, 0 ends each subject list
+    tokens = np.fromstring(sys.stdin.buffer.read(), dtype=np.int64, sep=' ')
+    T, N, M = tokens[:3].tolist()
+    ends = np.flatnonzero(tokens[3:] == 0)[:N + T] + 3
+    starts = np.concatenate(([3], ends[:-1] + 1))
+    values = tokens.tolist()
+    lists = [values[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
     
-    class_subjects = []
-    class_subjects.append([])
-    for _ in range(N):
-        subjects = list(map(int, input().split()))
-        class_subjects.append(subjects[:-1])
-        
-    teacher_subjects = []
-    teacher_subjects.append([])
-    for _ in range(T):
-        subjects = list(map(int, input().split()))
-        teacher_subjects.append(subjects[:-1])
+    class_subjects = [[]] + lists[:N]
+    teacher_subjects = [[]] + lists[N:]
     
-    subject_periods = list(map(int, input().split()))
-    subject_periods.insert(0, [])
+    position = int(ends[-1]) + 1 if N + T else 3
+    subject_periods = [[]] + values[position:position + M]
     
     # Make subject teachers list
     subject_teachers = [[] for i in range(M + 1)]
@@ -430,15 +427,13 @@ if __name__ == "__main__":
         for subject in subjects:
             subject_teachers[subject].append(teacher)
             
-    # Make choiceable time for each subject
-    subject_times = [[i for i in range(1, 61)] for i in range(M + 1)]
-    six_multiples = [s * 6 for s in range(1, 11)]
-    for subject, subject_period in enumerate(subject_periods):
-        if subject == 0:
-            continue
-        for s in six_multiples:
-            for i in range(subject_periods[subject] - 1):
-                subject_times[subject].remove(s - i)
+    # Make choiceable time for each subject: start and end in the same session
+    times_by_periods = {}
+    subject_times = [[i for i in range(1, 61)]]
+    for periods in subject_periods[1:]:
+        if periods not in times_by_periods:
+            times_by_periods[periods] = [i for i in range(1, 61) if (i - 1) // 6 == (i + periods - 2) // 6]
+        subject_times.append(times_by_periods[periods])
     
     # Initialize algorithm
     if True: